@@ -0,0 +1,55 @@
+"""
+Measures the per-call overhead of unsync's instrumentation, with nothing listening, with stats enabled
+and with an exporter hook added.
+Run with `python benchmarks/instrumentation.py`.
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from unsync import unsync  # noqa: E402
+
+
+@unsync
+async def noop():
+    return None
+
+
+@unsync
+def thread_noop():
+    return None
+
+
+@unsync
+async def await_calls(calls):
+    for _ in range(calls):
+        await noop()
+
+
+def fan_out(calls):
+    for future in [thread_noop() for _ in range(calls)]:
+        future.result()
+
+
+def per_call(function, calls):
+    start = time.perf_counter()
+    function(calls)
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def run(label, calls):
+    print('{}: async {:.1f} us, thread {:.1f} us per call'.format(
+        label, per_call(lambda calls: await_calls(calls).result(), calls), per_call(fan_out, calls)))
+
+
+if __name__ == "__main__":
+    calls = 20000
+    await_calls(100).result()
+    run('nothing listening', calls)
+    unsync.configure(stats=True)
+    run('stats enabled', calls)
+    unsync.configure(stats=False)
+    unsync.add_hook(lambda record: None)
+    run('hook added', calls)
@@ -0,0 +1,253 @@
+"""
+Benchmark suite for unsync's dispatch overhead.
+Run with `python benchmarks/run.py [--output results.json] [--baseline baseline.json] [--tolerance 0.25] [--quick]`.
+Results are written as JSON, and compared against a baseline written by an earlier run, exiting with status 1
+if any benchmark is slower than the baseline by more than the tolerance.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from unsync import unsync, Unfuture  # noqa: E402
+
+BENCHMARKS = []
+
+
+def benchmark(unit, name=None):
+    def register(function):
+        BENCHMARKS.append((name or function.__name__, unit, function))
+        return function
+    return register
+
+
+@unsync
+async def async_noop():
+    return None
+
+
+@unsync
+def thread_noop():
+    return None
+
+
+@unsync(cpu_bound=True)
+def cpu_bound_noop():
+    return None
+
+
+@unsync
+async def await_calls(calls):
+    for _ in range(calls):
+        await async_noop()
+
+
+class Service(object):
+    @unsync
+    async def noop(self):
+        return None
+
+
+@unsync
+async def await_method_calls(calls):
+    services = [Service() for _ in range(100)]
+    for index in range(calls):
+        await services[index % 100].noop()
+
+
+@unsync
+async def wait_for(future):
+    return await future
+
+
+def per_call_us(function, calls):
+    start = time.perf_counter()
+    function(calls)
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def blocking_calls(function):
+    def run(calls):
+        for _ in range(calls):
+            function().result()
+    return run
+
+
+def fan_out(function):
+    def run(calls):
+        for future in [function() for _ in range(calls)]:
+            future.result()
+    return run
+
+
+@benchmark('us per call')
+def async_awaited(scale):
+    return per_call_us(lambda calls: await_calls(calls).result(), 20000 // scale)
+
+
+@benchmark('us per call')
+def method_awaited(scale):
+    return per_call_us(lambda calls: await_method_calls(calls).result(), 20000 // scale)
+
+
+@benchmark('ns per access')
+def method_lookup(scale):
+    service = Service()
+    calls = 200000 // scale
+    start = time.perf_counter()
+    for _ in range(calls):
+        service.noop
+    return (time.perf_counter() - start) / calls * 1e9
+
+
+@benchmark('us per call')
+def async_blocking(scale):
+    return per_call_us(blocking_calls(async_noop), 5000 // scale)
+
+
+@benchmark('us per call')
+def thread_blocking(scale):
+    return per_call_us(blocking_calls(thread_noop), 5000 // scale)
+
+
+@benchmark('us per call')
+def cpu_bound_blocking(scale):
+    return per_call_us(blocking_calls(cpu_bound_noop), 1000 // scale)
+
+
+def fan_out_benchmark(label, function, tasks):
+    @benchmark('us per task', 'fan_out_{}_{}'.format(label, tasks))
+    def fan_out_in(scale):
+        return per_call_us(fan_out(function), max(tasks // scale, 10))
+
+
+def then_chain_benchmark(depth):
+    @benchmark('us per link', 'then_chain_{}'.format(depth))
+    def then_chain(scale):
+        def run(calls):
+            for _ in range(calls):
+                future = async_noop()
+                for _ in range(depth):
+                    future = future.then(lambda result: result)
+                future.result()
+        return per_call_us(run, 1000 // scale) / depth
+
+
+for _tasks in [10, 100, 1000, 10000, 100000]:
+    fan_out_benchmark('async', async_noop, _tasks)
+for _tasks in [10, 100, 1000, 10000]:
+    fan_out_benchmark('thread', thread_noop, _tasks)
+for _tasks in [10, 100, 1000]:
+    fan_out_benchmark('cpu_bound', cpu_bound_noop, _tasks)
+for _depth in [1, 5, 20]:
+    then_chain_benchmark(_depth)
+
+
+@benchmark('us per result')
+def cross_thread_result(scale):
+    calls = 5000 // scale
+    start = time.perf_counter()
+    for _ in range(calls):
+        future = Unfuture()
+        future.set_result(None)
+        future.result()
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+@benchmark('bytes per Unfuture')
+def pending_unfuture_memory(scale):
+    calls = 10000 // scale
+    source = Unfuture()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    pending = [wait_for(source) for _ in range(calls)]
+    # Let every call start before measuring
+    wait_for(Unfuture.from_value(None)).result()
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    source.set_result(None)
+    for future in pending:
+        future.result()
+    return used / calls
+
+
+IMPORT = '''
+import time
+start = time.perf_counter()
+from unsync import unsync
+
+@unsync(cpu_bound=True)
+def work():
+    pass
+
+print(time.perf_counter() - start)
+'''
+
+
+@benchmark('ms per import')
+def import_time(scale):
+    # Importing unsync and decorating a function in a fresh interpreter, as CLI tools and worker processes do
+    runs = [float(subprocess.check_output([sys.executable, '-c', IMPORT], cwd=ROOT)) for _ in range(20 // scale + 1)]
+    return min(runs) * 1e3
+
+
+def run(names=None, quick=False):
+    scale = 10 if quick else 1
+    unsync.warm_up()
+    results = {}
+    for name, unit, function in BENCHMARKS:
+        if names and name not in names:
+            continue
+        function(scale * 10)
+        results[name] = {'value': function(scale), 'unit': unit}
+        print('{:<28} {:>12.2f} {}'.format(name, results[name]['value'], unit))
+    return results
+
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    for name, result in sorted(results.items()):
+        if name not in baseline:
+            continue
+        ratio = result['value'] / baseline[name]['value']
+        status = 'REGRESSION' if ratio > 1 + tolerance else 'ok'
+        print('{:<28} {:>8.2f}x baseline {}'.format(name, ratio, status))
+        if status != 'ok':
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--output', help='file to write the results to as JSON')
+    parser.add_argument('--baseline', help='JSON results of an earlier run to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed slowdown against the baseline')
+    parser.add_argument('--quick', action='store_true', help='run a tenth of the iterations')
+    parser.add_argument('names', nargs='*', help='only run these benchmarks')
+    args = parser.parse_args()
+
+    results = run(args.names, args.quick)
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump({
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'time': time.time(),
+                'results': results,
+            }, file, indent=2, sort_keys=True)
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)['results']
+        if compare(results, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
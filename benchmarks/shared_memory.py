@@ -0,0 +1,49 @@
+"""
+Compares passing a large bytes argument to a cpu_bound function by pickling and through shared memory.
+Run with `python benchmarks/shared_memory.py [size in MB ...]`, by default 1, 100 and 1000 MB.
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from unsync import unsync  # noqa: E402
+
+
+@unsync(cpu_bound=True)
+def pickled(data):
+    return len(data)
+
+
+@unsync(cpu_bound=True, shared_memory=True)
+def shared(data):
+    return len(data)
+
+
+@unsync(cpu_bound=True)
+def pickled_echo(data):
+    return data
+
+
+@unsync(cpu_bound=True, shared_memory=True)
+def shared_echo(data):
+    return data
+
+
+def timed(function, data, repeat=3):
+    function(b'').result()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function(data).result()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+if __name__ == "__main__":
+    sizes = [int(size) for size in sys.argv[1:]] or [1, 100, 1000]
+    for size in sizes:
+        data = bytes(size << 20)
+        print('{} MB argument: pickled {:.1f} ms, shared memory {:.1f} ms'.format(
+            size, timed(pickled, data), timed(shared, data)))
+        print('{} MB argument and result: pickled {:.1f} ms, shared memory {:.1f} ms'.format(
+            size, timed(pickled_echo, data), timed(shared_echo, data)))
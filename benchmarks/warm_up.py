@@ -0,0 +1,43 @@
+"""
+Measures the time to the first cpu_bound result in a fresh process, with and without unsync.warm_up,
+against the steady state latency.
+Run with `python benchmarks/warm_up.py`.
+"""
+import os
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from unsync import unsync  # noqa: E402
+
+
+@unsync(cpu_bound=True)
+def work():
+    # Stands in for a function in a module with heavy imports
+    import email.mime.multipart  # noqa: F401
+    import decimal  # noqa: F401
+    return 'faff'
+
+
+def first_and_steady(warm):
+    if warm:
+        unsync.warm_up(preload=['email.mime.multipart', 'decimal'])
+    start = time.perf_counter()
+    work().result()
+    first = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(100):
+        work().result()
+    return first, (time.perf_counter() - start) / 100
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        print('{:.2f} {:.2f}'.format(*(seconds * 1000 for seconds in first_and_steady(sys.argv[1] == 'warm'))))
+    else:
+        for mode in ['cold', 'warm']:
+            output = subprocess.check_output([sys.executable, __file__, mode], universal_newlines=True)
+            first, steady = output.split()
+            print('{}: first result {} ms, steady state {} ms'.format(mode, first, steady))
@@ -15,7 +15,7 @@ async def initiate(request):
 @unsync
 async def process(task):
     await asyncio.sleep(0.1)
-    return task.result() * 2
+    return task * 2
 
 
 start = time.time()
@@ -15,12 +15,11 @@ def non_async_function(num):
 
 
 @unsync
-async def result_continuation(task):
+async def result_continuation(result):
     """A preliminary result processor we'll chain on to the original task
-       This will get executed wherever the source task was executed, in this
-       case one of the threads in the ThreadPoolExecutor"""
+       It is called with the result of that task once it is done"""
     await asyncio.sleep(0.1)
-    num, res = task.result()
+    num, res = result
     return num, res * 2
 
 
@@ -0,0 +1,74 @@
+from concurrent.futures import ThreadPoolExecutor
+from unittest import TestCase
+import threading
+import time
+
+from unsync import unsync, AdaptiveThreadPoolExecutor
+
+
+class AdaptiveThreadPoolExecutorTests(TestCase):
+    def setUp(self):
+        self.executor = AdaptiveThreadPoolExecutor(min_workers=1, max_workers=8, target_wait=0.01, idle_timeout=0.2)
+
+    def tearDown(self):
+        self.executor.shutdown()
+
+    def test_results(self):
+        futures = [self.executor.submit(pow, value, 2) for value in range(100)]
+        self.assertEqual([value ** 2 for value in range(100)], [future.result(5) for future in futures])
+
+    def test_exception(self):
+        with self.assertRaises(ZeroDivisionError):
+            self.executor.submit(lambda: 1 / 0).result(5)
+
+    def test_fast_calls_stay_on_few_threads(self):
+        for _ in range(200):
+            self.executor.submit(lambda: None).result(5)
+        self.assertEqual(1, self.executor.size)
+
+    def test_grows_when_calls_queue(self):
+        release = threading.Event()
+        futures = [self.executor.submit(release.wait, 5) for _ in range(20)]
+        deadline = time.time() + 5
+        while self.executor.size < 8 and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(8, self.executor.size)
+        self.assertEqual(12, self.executor.queue_depth)
+        release.set()
+        for future in futures:
+            future.result(5)
+
+    def test_shrinks_when_idle(self):
+        release = threading.Event()
+        futures = [self.executor.submit(release.wait, 5) for _ in range(8)]
+        deadline = time.time() + 5
+        while self.executor.size < 8 and time.time() < deadline:
+            time.sleep(0.01)
+        release.set()
+        for future in futures:
+            future.result(5)
+        deadline = time.time() + 5
+        while self.executor.size > 1 and time.time() < deadline:
+            time.sleep(0.05)
+        self.assertEqual(1, self.executor.size)
+
+    def test_submit_after_shutdown(self):
+        self.executor.shutdown()
+        with self.assertRaises(RuntimeError):
+            self.executor.submit(lambda: None)
+
+
+class ConfigureTests(TestCase):
+    def tearDown(self):
+        unsync.configure(thread_executor=ThreadPoolExecutor())
+
+    def test_configure_adaptive(self):
+        unsync.configure(thread_executor='adaptive')
+        self.assertIsInstance(unsync.thread_executor, AdaptiveThreadPoolExecutor)
+
+        @unsync
+        def thread_name():
+            return threading.current_thread().name
+
+        self.assertTrue(thread_name().result(5).startswith('unsync-adaptive'))
+        self.assertEqual(unsync.thread_executor.size, unsync.stats()['thread_executor']['size'])
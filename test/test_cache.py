@@ -0,0 +1,101 @@
+from unittest import TestCase
+import asyncio
+import time
+
+from unsync import unsync, LRU
+
+
+@unsync(cpu_bound=True, cache=LRU(8))
+def cpu_bound_time(value):
+    return value, time.time()
+
+
+class CacheTests(TestCase):
+    def test_single_flight(self):
+        calls = []
+
+        @unsync(cache=LRU())
+        def work(value):
+            calls.append(value)
+            time.sleep(0.1)
+            return value
+
+        tasks = [work('faff') for _ in range(10)]
+        self.assertEqual(['faff'] * 10, [task.result() for task in tasks])
+        self.assertEqual(['faff'], calls)
+
+    def test_cancel_leaves_shared_call(self):
+        @unsync(cache=LRU())
+        async def work(value):
+            await asyncio.sleep(0.1)
+            return value
+
+        cancelled, other = work('faff'), work('faff')
+        self.assertTrue(cancelled.then(lambda value: value).cancel())
+        self.assertEqual('faff', other.result())
+
+    def test_completed_results(self):
+        calls = []
+
+        @unsync(cache=LRU())
+        async def work(value):
+            calls.append(value)
+            return value
+
+        self.assertEqual('faff', work('faff').result())
+        self.assertEqual('faff', work('faff').result())
+        self.assertEqual('derp', work(value='derp').result())
+        self.assertEqual(['faff', 'derp'], calls)
+
+    def test_ttl(self):
+        calls = []
+
+        @unsync(cache=LRU(ttl=0.1))
+        async def work():
+            calls.append(None)
+
+        work().result()
+        work().result()
+        time.sleep(0.2)
+        work().result()
+        self.assertEqual(2, len(calls))
+
+    def test_failures_not_cached(self):
+        calls = []
+
+        @unsync(cache=LRU())
+        async def fail():
+            calls.append(None)
+            raise ValueError()
+
+        for _ in range(2):
+            with self.assertRaises(ValueError):
+                fail().result()
+            # The entry is removed from a callback on the loop just after the result is set
+            time.sleep(0.05)
+        self.assertEqual(2, len(calls))
+
+    def test_eviction(self):
+        cache = LRU(2)
+
+        @unsync(cache=cache)
+        async def work(value):
+            await asyncio.sleep(0)
+            return value
+
+        first = work(1)
+        work(2), work(3)
+        self.assertEqual(2, len(cache))
+        self.assertIsNot(first, work(1))
+
+    def test_unhashable_arguments(self):
+        @unsync(cache=LRU())
+        def work(values):
+            return sum(values)
+
+        self.assertIsNot(work([1, 2]), work([1, 2]))
+
+    def test_cpu_bound(self):
+        first = cpu_bound_time(1).result()
+        self.assertEqual(first, cpu_bound_time(1).result())
+        self.assertNotEqual(first, cpu_bound_time(2).result())
@@ -0,0 +1,62 @@
+from unittest import TestCase
+import asyncio
+import threading
+
+from unsync import unsync
+
+
+@unsync(caller_loop=True)
+async def current_thread():
+    await asyncio.sleep(0)
+    return threading.current_thread()
+
+
+@unsync
+async def default_thread():
+    return threading.current_thread()
+
+
+class CallerLoopTests(TestCase):
+    def tearDown(self):
+        unsync.configure(caller_loop=False)
+
+    def run_in_foreign_loop(self, coro):
+        loop = asyncio.new_event_loop()
+        try:
+            return loop.run_until_complete(coro)
+        finally:
+            loop.close()
+
+    def test_runs_on_caller_loop(self):
+        async def main():
+            return await current_thread()
+
+        self.assertIs(threading.current_thread(), self.run_in_foreign_loop(main()))
+
+    def test_synchronous_caller_uses_unsync_loop(self):
+        self.assertIs(unsync.thread, current_thread().result(5))
+
+    def test_nested_calls(self):
+        @unsync(caller_loop=True)
+        async def outer():
+            return [await current_thread() for _ in range(3)]
+
+        async def main():
+            return await outer()
+
+        self.assertEqual([threading.current_thread()] * 3, self.run_in_foreign_loop(main()))
+
+    def test_global(self):
+        async def main():
+            return await default_thread()
+
+        self.assertIs(unsync.thread, self.run_in_foreign_loop(main()))
+        unsync.configure(caller_loop=True)
+        self.assertIs(threading.current_thread(), self.run_in_foreign_loop(main()))
+
+    def test_result_not_allowed(self):
+        async def main():
+            return current_thread().result()
+
+        with self.assertRaises(asyncio.InvalidStateError):
+            self.run_in_foreign_loop(main())
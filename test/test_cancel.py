@@ -0,0 +1,213 @@
+from concurrent.futures import CancelledError
+from unittest import TestCase
+import asyncio
+import os
+import threading
+import time
+
+from unsync import unsync
+
+
+@unsync(cpu_bound=True)
+def cooperative(duration):
+    start = time.time()
+    while time.time() - start < duration:
+        if unsync.cancelled():
+            return 'cancelled'
+        time.sleep(0.01)
+    return 'finished'
+
+
+@unsync(cpu_bound=True, kill_after=0.2)
+def stubborn(duration):
+    time.sleep(duration)
+    return os.getpid()
+
+
+@unsync(cpu_bound=True)
+def pid():
+    return os.getpid()
+
+
+@unsync(cpu_bound=True, timeout=0.2)
+def cpu_bound_timeout(duration):
+    start = time.time()
+    while time.time() - start < duration and not unsync.cancelled():
+        time.sleep(0.01)
+    return 'faff'
+
+
+class CancelTests(TestCase):
+    def test_cancel_coroutine(self):
+        started = threading.Event()
+
+        @unsync
+        async def sleep():
+            started.set()
+            await asyncio.sleep(10)
+
+        future = sleep()
+        started.wait(5)
+        self.assertTrue(future.cancel())
+        with self.assertRaises(CancelledError):
+            future.result(5)
+        self.assertTrue(future.cancelled())
+
+    def test_cancel_done(self):
+        @unsync
+        async def faff():
+            return 'faff'
+
+        future = faff()
+        future.result()
+        self.assertFalse(future.cancel())
+
+    def test_cancel_queued_thread_call(self):
+        release = threading.Event()
+
+        @unsync(max_concurrency=1)
+        def block():
+            release.wait(5)
+            return 'faff'
+
+        running = block()
+        queued = block()
+        self.assertTrue(queued.cancel())
+        with self.assertRaises(CancelledError):
+            queued.result(5)
+        release.set()
+        self.assertEqual('faff', running.result(5))
+
+    def test_running_thread_call_cannot_be_cancelled(self):
+        started = threading.Event()
+        release = threading.Event()
+
+        @unsync
+        def block():
+            started.set()
+            release.wait(5)
+            return 'faff'
+
+        future = block()
+        started.wait(5)
+        self.assertFalse(future.cancel())
+        release.set()
+        self.assertEqual('faff', future.result(5))
+
+    def test_cancel_from_awaiting_coroutine(self):
+        @unsync
+        async def sleep():
+            await asyncio.sleep(10)
+
+        @unsync
+        async def caller():
+            inner = sleep()
+            await asyncio.sleep(0.05)
+            inner.cancel()
+            try:
+                await inner
+            except asyncio.CancelledError:
+                return 'cancelled'
+
+        self.assertEqual('cancelled', caller().result(5))
+
+    def test_cancel_flows_through_then(self):
+        started = threading.Event()
+
+        @unsync
+        async def sleep():
+            started.set()
+            await asyncio.sleep(10)
+
+        source = sleep()
+        chained = source.then(lambda _: 'faff')
+        started.wait(5)
+        time.sleep(0.05)
+        self.assertTrue(chained.cancel())
+        with self.assertRaises(CancelledError):
+            source.result(5)
+
+    def test_cancel_leaves_other_continuations(self):
+        @unsync
+        async def sleep():
+            await asyncio.sleep(0.1)
+            return 'faff'
+
+        source = sleep()
+        first = source.then(lambda value: value)
+        second = source.then(lambda value: value)
+        self.assertTrue(first.cancel())
+        self.assertEqual('faff', second.result(5))
+        with self.assertRaises(CancelledError):
+            first.result(5)
+
+
+class ProcessCancelTests(TestCase):
+    def test_cooperative_cancel(self):
+        future = cooperative(10)
+        time.sleep(0.5)
+        start = time.time()
+        self.assertTrue(future.cancel())
+        with self.assertRaises(CancelledError):
+            future.result(5)
+        # The worker is freed as soon as the function notices
+        self.assertEqual('finished', cooperative(0).result(5))
+        self.assertLess(time.time() - start, 5)
+
+    def test_kill_after(self):
+        pid().result(10)
+        executor = unsync.process_executor
+        future = stubborn(60)
+        time.sleep(0.5)
+        self.assertTrue(future.cancel())
+        with self.assertRaises(CancelledError):
+            future.result(5)
+        # The worker is killed after kill_after seconds, and the pool replaced
+        deadline = time.time() + 5
+        while unsync.process_executor is executor and time.time() < deadline:
+            time.sleep(0.05)
+        self.assertIsNot(executor, unsync.process_executor)
+        self.assertIsInstance(pid().result(30), int)
+
+
+class TimeoutTests(TestCase):
+    def test_coroutine_timeout(self):
+        @unsync(timeout=0.1)
+        async def sleep(duration):
+            await asyncio.sleep(duration)
+            return 'faff'
+
+        self.assertEqual('faff', sleep(0).result(5))
+        with self.assertRaises(asyncio.TimeoutError):
+            sleep(10).result(5)
+
+    def test_thread_timeout(self):
+        @unsync(timeout=0.1)
+        def sleep(duration):
+            time.sleep(duration)
+            return 'faff'
+
+        self.assertEqual('faff', sleep(0).result(5))
+        start = time.time()
+        with self.assertRaises(asyncio.TimeoutError):
+            sleep(1).result(5)
+        self.assertLess(time.time() - start, 1)
+
+    def test_timeout_includes_queue_wait(self):
+        @unsync(timeout=0.2, max_concurrency=1)
+        def sleep(duration):
+            time.sleep(duration)
+            return 'faff'
+
+        first = sleep(0.5)
+        second = sleep(0)
+        with self.assertRaises(asyncio.TimeoutError):
+            second.result(5)
+        with self.assertRaises(asyncio.TimeoutError):
+            first.result(5)
+
+    def test_cpu_bound_timeout(self):
+        start = time.time()
+        with self.assertRaises(asyncio.TimeoutError):
+            cpu_bound_timeout(10).result(10)
+        self.assertLess(time.time() - start, 5)
@@ -0,0 +1,110 @@
+from concurrent.futures import CancelledError
+from unittest import TestCase
+import asyncio
+import threading
+import time
+
+from unsync import unsync, Unfuture
+
+
+@unsync
+async def async_sleep(duration):
+    await asyncio.sleep(duration)
+    return 'faff'
+
+
+@unsync
+def thread_sleep(duration):
+    time.sleep(duration)
+    return 'faff'
+
+
+class ForeignLoopTests(TestCase):
+    def run_in_foreign_loop(self, coro):
+        results = []
+
+        def run():
+            loop = asyncio.new_event_loop()
+            try:
+                results.append(loop.run_until_complete(coro))
+            except BaseException as exc:
+                results.append(exc)
+            finally:
+                loop.close()
+
+        thread = threading.Thread(target=run)
+        thread.start()
+        thread.join(10)
+        if isinstance(results[0], BaseException):
+            raise results[0]
+        return results[0]
+
+    async def await_with_ticker(self, future):
+        # Counts how often the foreign loop gets to run while waiting
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        task = asyncio.ensure_future(ticker())
+        result = await future
+        task.cancel()
+        return result, ticks
+
+    def test_await_coroutine(self):
+        result, ticks = self.run_in_foreign_loop(self.await_with_ticker(async_sleep(0.3)))
+        self.assertEqual('faff', result)
+        self.assertGreater(ticks, 10)
+
+    def test_await_thread_call(self):
+        result, ticks = self.run_in_foreign_loop(self.await_with_ticker(thread_sleep(0.3)))
+        self.assertEqual('faff', result)
+        self.assertGreater(ticks, 10)
+
+    def test_await_done(self):
+        async def wait():
+            return await Unfuture.from_value('faff')
+
+        self.assertEqual('faff', self.run_in_foreign_loop(wait()))
+
+    def test_await_exception(self):
+        @unsync
+        def fail():
+            raise ValueError('faff')
+
+        async def wait():
+            return await fail()
+
+        with self.assertRaises(ValueError):
+            self.run_in_foreign_loop(wait())
+
+    def test_cancelled_await_cancels_call(self):
+        started = threading.Event()
+
+        @unsync
+        async def sleep():
+            started.set()
+            await asyncio.sleep(10)
+
+        future = sleep()
+
+        async def wait():
+            try:
+                await asyncio.wait_for(future, 0.1)
+            except asyncio.TimeoutError:
+                return 'timeout'
+
+        self.assertEqual('timeout', self.run_in_foreign_loop(wait()))
+        with self.assertRaises(CancelledError):
+            future.result(5)
+
+    def test_result_in_foreign_loop(self):
+        future = thread_sleep(0.2)
+
+        async def block():
+            return future.result()
+
+        self.assertEqual('faff', self.run_in_foreign_loop(block()))
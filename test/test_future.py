@@ -1,4 +1,5 @@
 from concurrent.futures import ThreadPoolExecutor
+import threading
 from unittest import TestCase
 import asyncio
 import time
@@ -6,6 +7,10 @@ import time
 from unsync import unsync, Unfuture
 
 
+def append_process(result):
+    return result + 'process'
+
+
 class FutureTests(TestCase):
     @staticmethod
     def executor():
@@ -84,6 +89,42 @@ class FutureTests(TestCase):
         res = source().then(cont_gen('a')).then(cont_gen('b')).then(cont_gen('c'))
         self.assertEqual('faffabc', res.result())
 
+    def test_continuation_failure(self):
+        def continuation(result):
+            raise ValueError(result)
+
+        @unsync
+        async def source():
+            return 'faff'
+
+        with self.assertRaises(ValueError):
+            source().then(continuation).then(lambda result: result + 'derp').result()
+
+    def test_continuation_runs_on_loop(self):
+        @unsync
+        async def source():
+            return 'faff'
+
+        res = source().then(lambda result: threading.current_thread())
+        self.assertIs(unsync.thread, res.result())
+
+    def test_then_in_thread(self):
+        @unsync
+        async def source():
+            return 'faff'
+
+        res = source().then_in_thread(lambda result: (result + 'thread', threading.current_thread()))
+        result, thread = res.result()
+        self.assertEqual('faffthread', result)
+        self.assertIsNot(unsync.thread, thread)
+
+    def test_then_in_process(self):
+        @unsync
+        async def source():
+            return 'faff'
+
+        self.assertEqual('faffprocess', source().then_in_process(append_process).result())
+
     def test_from_result(self):
         future = Unfuture.from_value('faff')
         self.assertEqual('faff', future.result())
@@ -108,3 +149,55 @@ class FutureTests(TestCase):
             return await _future
 
         self.assertEqual('faff', wait(future).result())
+
+    def test_coroutines_from_foreign_threads(self):
+        @unsync
+        async def echo(value):
+            return value
+
+        def create():
+            return [echo(i) for i in range(200)]
+
+        futures = [f for fs in ThreadPoolExecutor(8).map(lambda _: create(), range(8)) for f in fs]
+        self.assertEqual(list(range(200)) * 8, [future.result(timeout=5) for future in futures])
+
+    def test_result_before_task_start(self):
+        @unsync
+        async def echo(value):
+            return value
+
+        blocker = threading.Event()
+        unsync.loop.call_soon_threadsafe(blocker.wait)
+        future = echo('faff')
+        results = []
+        waiter = threading.Thread(target=lambda: results.append(future.result(timeout=5)))
+        waiter.start()
+        # Give the waiter time to create the concurrent Future while the loop is still blocked
+        time.sleep(0.1)
+        self.assertFalse(future.done())
+        blocker.set()
+        waiter.join(5)
+        self.assertEqual(['faff'], results)
+
+    def test_concurrent_future_after_completion(self):
+        @unsync
+        async def echo(value):
+            return value
+
+        future = echo('faff')
+        future.result()
+        self.assertEqual('faff', future.concurrent_future.result(timeout=1))
+
+    def test_done_without_concurrent_future(self):
+        @unsync
+        async def wait():
+            await asyncio.sleep(0.1)
+
+        @unsync
+        async def check():
+            future = wait()
+            done_before = future.done()
+            await future
+            return done_before, future.done(), future._concurrent_future
+
+        self.assertEqual((False, True, None), check().result())
@@ -0,0 +1,160 @@
+from unittest import TestCase, mock
+import asyncio
+import gc
+import threading
+import weakref
+
+from unsync import unsync, Graph
+from unsync.unsync import _multiprocess_chain_target
+
+
+@unsync(cpu_bound=True)
+def square(value):
+    return value * value
+
+
+@unsync(cpu_bound=True)
+def increment(value):
+    return value + 1
+
+
+class Payload(object):
+    def __init__(self, value):
+        self.value = value
+
+
+class GraphTests(TestCase):
+    def test_diamond(self):
+        @unsync
+        async def load(value):
+            await asyncio.sleep(0.01)
+            return value
+
+        @unsync
+        def double(value):
+            return value * 2
+
+        @unsync
+        async def add(left, right):
+            return left + right
+
+        graph = Graph()
+        source = graph.add(load, 3)
+        total = graph.add(add, graph.add(double, source), right=graph.add(square, source))
+        future, = graph.submit(total)
+        self.assertEqual(15, future.result(10))
+
+    def test_default_outputs(self):
+        @unsync
+        def identity(value):
+            return value
+
+        graph = Graph()
+        first = graph.add(identity, 1)
+        graph.add(identity, first)
+        graph.add(identity, first)
+        self.assertEqual([1, 1], [future.result(5) for future in graph.submit()])
+
+    def test_only_needed_nodes_run(self):
+        calls = []
+
+        @unsync
+        def record(value):
+            calls.append(value)
+            return value
+
+        graph = Graph()
+        needed = graph.add(record, 'needed')
+        graph.add(record, 'unused')
+        self.assertEqual('needed', graph.submit(needed)[0].result(5))
+        self.assertEqual(['needed'], calls)
+
+    def test_failure_propagates(self):
+        @unsync
+        def fail():
+            raise ValueError('faff')
+
+        calls = []
+
+        @unsync
+        def after(value):
+            calls.append(value)
+
+        graph = Graph()
+        future, = graph.submit(graph.add(after, graph.add(fail)))
+        with self.assertRaises(ValueError):
+            future.result(5)
+        self.assertEqual([], calls)
+
+    def test_repeated_outputs(self):
+        @unsync
+        def identity(value):
+            return value
+
+        graph = Graph()
+        first = graph.add(identity, 1)
+        second = graph.add(identity, 2)
+        self.assertEqual([2, 1, 2], [future.result(5) for future in graph.submit(second, first, second)])
+
+    def test_failure_through_stacked_diamonds(self):
+        @unsync
+        def fail():
+            raise ValueError('faff')
+
+        @unsync
+        def add(left, right):
+            return left + right
+
+        graph = Graph()
+        node = graph.add(fail)
+        for _ in range(40):
+            node = graph.add(add, graph.add(add, node, 1), graph.add(add, node, 2))
+        future, = graph.submit(node)
+        with self.assertRaises(ValueError):
+            future.result(5)
+
+    def test_cpu_bound_chain_is_fused(self):
+        graph = Graph()
+        result = graph.add(increment, graph.add(square, graph.add(increment, 2)))
+        submit = unsync.process_executor.submit
+        with mock.patch.object(unsync.process_executor, 'submit', side_effect=submit) as submitted:
+            future, = graph.submit(result)
+            self.assertEqual(10, future.result(10))
+        self.assertEqual(1, submitted.call_count)
+        self.assertIs(_multiprocess_chain_target, submitted.call_args[0][0])
+
+    def test_fused_chain_after_other_call(self):
+        @unsync
+        def load(value):
+            return value
+
+        graph = Graph()
+        result = graph.add(increment, graph.add(square, graph.add(load, 3)))
+        future, = graph.submit(result)
+        self.assertEqual(10, future.result(10))
+
+    def test_shared_result_not_fused(self):
+        graph = Graph()
+        shared = graph.add(square, 3)
+        left, right = graph.add(increment, shared), graph.add(square, shared)
+        self.assertEqual([10, 81], [future.result(10) for future in graph.submit(left, right)])
+
+    def test_intermediate_results_released(self):
+        released = threading.Event()
+        references = []
+
+        @unsync
+        def make():
+            payload = Payload(2)
+            references.append(weakref.ref(payload, lambda _: released.set()))
+            return payload
+
+        @unsync
+        def unwrap(payload):
+            return payload.value
+
+        graph = Graph()
+        future, = graph.submit(graph.add(unwrap, graph.add(make)))
+        self.assertEqual(2, future.result(5))
+        gc.collect()
+        self.assertTrue(released.wait(5))
@@ -0,0 +1,68 @@
+from unittest import TestCase, skipUnless
+import json
+import os
+import subprocess
+import sys
+
+from unsync import unsync
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_ONLY = '''
+import json, sys
+from unsync import unsync
+
+@unsync
+def regular():
+    pass
+
+@unsync
+async def coroutine():
+    pass
+
+@unsync(cpu_bound=True)
+def cpu_bound():
+    pass
+
+print(json.dumps({
+    'modules': [name for name in ('asyncio', 'concurrent.futures', 'inspect') if name in sys.modules],
+    'thread_executor': unsync.__dict__.get('_thread_executor') is not None,
+    'loops': unsync.__dict__.get('_loops') is not None,
+    'registered': sorted(name for _, name in unsync.unsync_functions),
+}))
+'''
+
+
+@unsync
+async def double(value):
+    return value * 2
+
+
+@unsync(cpu_bound=True)
+def double_in_worker(value):
+    return double(value).result(), os.getpid()
+
+
+class LazyTests(TestCase):
+    def test_import_creates_nothing(self):
+        output = subprocess.check_output([sys.executable, '-c', IMPORT_ONLY], cwd=ROOT, universal_newlines=True)
+        state = json.loads(output)
+        self.assertEqual([], state['modules'])
+        self.assertFalse(state['thread_executor'])
+        self.assertFalse(state['loops'])
+        self.assertEqual(['cpu_bound'], state['registered'])
+
+    def test_lazy_exports(self):
+        import unsync as package
+        from unsync.graph import Graph
+        self.assertIs(Graph, package.Graph)
+        with self.assertRaises(AttributeError):
+            package.missing
+
+    @skipUnless(hasattr(os, 'fork'), 'Needs fork')
+    def test_forked_worker_starts_its_own_loop(self):
+        # The parent's loop thread doesn't exist in forked workers
+        self.assertEqual(2, double(1).result(5))
+        result, pid = double_in_worker(3).result(10)
+        self.assertEqual(6, result)
+        self.assertNotEqual(os.getpid(), pid)
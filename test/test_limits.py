@@ -0,0 +1,100 @@
+from concurrent.futures import ThreadPoolExecutor
+from unittest import TestCase
+import asyncio
+import threading
+import time
+
+from unsync import unsync
+
+
+@unsync(cpu_bound=True, max_concurrency=2)
+def cpu_bound_interval(duration):
+    start = time.time()
+    time.sleep(duration)
+    return start, time.time()
+
+
+class Counter(object):
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.current = 0
+        self.peak = 0
+
+    def __enter__(self):
+        with self.lock:
+            self.current += 1
+            self.peak = max(self.peak, self.current)
+
+    def __exit__(self, *args):
+        with self.lock:
+            self.current -= 1
+
+
+class LimitTests(TestCase):
+    def test_thread_max_concurrency(self):
+        counter = Counter()
+
+        @unsync(max_concurrency=2)
+        def work(value):
+            with counter:
+                time.sleep(0.05)
+            return value
+
+        tasks = [work(i) for i in range(10)]
+        self.assertEqual(list(range(10)), [task.result() for task in tasks])
+        self.assertEqual(2, counter.peak)
+
+    def test_async_max_concurrency(self):
+        counter = Counter()
+
+        @unsync(max_concurrency=3)
+        async def work(value):
+            with counter:
+                await asyncio.sleep(0.05)
+            return value
+
+        tasks = [work(i) for i in range(12)]
+        self.assertEqual(list(range(12)), [task.result() for task in tasks])
+        self.assertEqual(3, counter.peak)
+
+    def test_cpu_bound_max_concurrency(self):
+        intervals = [task.result() for task in [cpu_bound_interval(0.1) for _ in range(6)]]
+        for start, _ in intervals:
+            self.assertLessEqual(sum(1 for other_start, other_end in intervals if other_start <= start < other_end), 2)
+
+    def test_exception_releases_slot(self):
+        @unsync(max_concurrency=1)
+        def fail():
+            raise ValueError()
+
+        tasks = [fail() for _ in range(3)]
+        for task in tasks:
+            with self.assertRaises(ValueError):
+                task.result(timeout=1)
+
+    def test_executor_instance(self):
+        executor = ThreadPoolExecutor(1, 'faff')
+
+        @unsync(executor=executor)
+        def thread_name():
+            return threading.current_thread().name
+
+        self.assertTrue(thread_name().result().startswith('faff'))
+
+    def test_named_executor(self):
+        unsync.configure(executors={'derp': 2})
+
+        @unsync(executor='derp')
+        def thread_name():
+            return threading.current_thread().name
+
+        self.assertTrue(thread_name().result().startswith('derp'))
+        self.assertIs(unsync.executor('derp'), unsync.executor('derp'))
+
+    def test_async_executor(self):
+        @unsync(executor='derp')
+        async def method():
+            pass
+
+        with self.assertRaises(TypeError):
+            method()
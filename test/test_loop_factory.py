@@ -0,0 +1,55 @@
+from unittest import TestCase
+import asyncio
+import os
+import subprocess
+import sys
+import threading
+
+from unsync import unsync
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+FACTORY_SCRIPT = '''
+import asyncio
+from unsync import unsync
+
+class TunedLoop(asyncio.SelectorEventLoop):
+    pass
+
+unsync.configure(loop_factory=TunedLoop)
+
+@unsync
+async def loop_type():
+    return type(asyncio.get_event_loop()).__name__
+
+print(loop_type().result(), type(asyncio.new_event_loop()).__name__)
+'''
+
+
+class LoopFactoryTests(TestCase):
+    def test_loop_factory(self):
+        output = subprocess.check_output([sys.executable, '-c', FACTORY_SCRIPT], cwd=ROOT, timeout=30)
+        unsync_loop, policy_loop = output.decode().split()
+        self.assertEqual('TunedLoop', unsync_loop)
+        # The event loop policy is left alone
+        self.assertNotEqual('TunedLoop', policy_loop)
+
+    def test_loop_factory_after_start(self):
+        unsync.loop
+        with self.assertRaises(RuntimeError):
+            unsync.configure(loop_factory=asyncio.new_event_loop)
+
+    def test_tuning(self):
+        unsync.configure(slow_callback_duration=0.5, loop_executor_workers=2)
+        try:
+            @unsync
+            async def settings():
+                loop = asyncio.get_event_loop()
+                thread = await loop.run_in_executor(None, lambda: threading.current_thread().name)
+                return loop.slow_callback_duration, thread
+
+            duration, thread = settings().result(5)
+            self.assertEqual(0.5, duration)
+            self.assertTrue(thread.startswith('unsync-loop-executor'))
+        finally:
+            unsync.configure(slow_callback_duration=0.1)
@@ -0,0 +1,103 @@
+from unittest import TestCase
+import asyncio
+
+from unsync import unsync
+
+
+class ShardedLoopTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        unsync.configure(loops=3)
+
+    @classmethod
+    def tearDownClass(cls):
+        unsync.configure(loops=1)
+
+    def test_loops(self):
+        self.assertEqual(3, len(unsync.loops))
+        self.assertIs(unsync.loop, unsync.loops[0])
+
+    def test_round_robin(self):
+        @unsync
+        async def running_loop():
+            return asyncio.get_event_loop()
+
+        loops = {running_loop().result() for _ in range(6)}
+        self.assertEqual(set(unsync.loops), loops)
+
+    def test_hash_placement(self):
+        @unsync(placement='hash', key='user')
+        async def running_loop(request, user):
+            return asyncio.get_event_loop()
+
+        self.assertEqual(1, len({running_loop(i, 'faff').result() for i in range(6)}))
+        self.assertEqual(1, len({running_loop(i, user='faff').result() for i in range(6)}))
+
+    def test_hash_requires_key(self):
+        with self.assertRaises(TypeError):
+            @unsync(placement='hash')
+            async def running_loop():
+                pass
+
+    def test_hash_missing_argument(self):
+        @unsync(placement='hash', key='user')
+        async def running_loop(request, user=None):
+            return asyncio.get_event_loop()
+
+        loops = {running_loop(i).result() for i in range(6)}
+        self.assertEqual(set(unsync.loops), loops)
+
+    def test_global_hash_placement(self):
+        @unsync
+        async def running_loop(value):
+            return asyncio.get_event_loop()
+
+        @unsync
+        def thread(value):
+            return value
+
+        unsync.configure(placement='hash')
+        try:
+            self.assertEqual(set(unsync.loops), {running_loop(i).result() for i in range(6)})
+            self.assertEqual(list(range(6)), [thread(i).result() for i in range(6)])
+        finally:
+            unsync.configure(placement='round_robin')
+
+    def test_sticky_placement(self):
+        @unsync(placement='sticky')
+        async def inner():
+            return asyncio.get_event_loop()
+
+        @unsync
+        async def outer():
+            return asyncio.get_event_loop(), await inner()
+
+        for _ in range(6):
+            outer_loop, inner_loop = outer().result()
+            self.assertIs(outer_loop, inner_loop)
+
+    def test_await_across_loops(self):
+        @unsync(placement='hash', key=0)
+        async def on_loop(index, future=None):
+            if future is not None:
+                return asyncio.get_event_loop(), await future
+            await asyncio.sleep(0.1)
+            return asyncio.get_event_loop()
+
+        first = on_loop(0)
+        second_loop, first_loop = on_loop(1, first).result()
+        self.assertIsNot(first_loop, second_loop)
+        self.assertIs(first_loop, first.future.get_loop())
+
+    def test_result_in_any_loop_thread(self):
+        @unsync
+        async def other():
+            await asyncio.sleep(0.1)
+
+        @unsync(placement='hash', key=0)
+        async def blocking(index):
+            return other().result()
+
+        for index in range(3):
+            with self.assertRaises(asyncio.InvalidStateError):
+                blocking(index).result()
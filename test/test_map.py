@@ -0,0 +1,98 @@
+from unittest import TestCase
+import asyncio
+import threading
+import time
+
+from unsync import unsync
+
+
+class MapTests(TestCase):
+    def test_map_unordered(self):
+        @unsync
+        def sleep(duration):
+            time.sleep(duration)
+            return duration
+
+        self.assertEqual([0.01, 0.1, 0.2], list(unsync.map(sleep, [0.2, 0.1, 0.01], window=3)))
+
+    def test_map_ordered(self):
+        @unsync
+        async def sleep(duration):
+            await asyncio.sleep(duration)
+            return duration
+
+        self.assertEqual([0.2, 0.1, 0.01], list(unsync.map(sleep, [0.2, 0.1, 0.01], ordered=True)))
+
+    def test_map_plain_function(self):
+        self.assertEqual(list(range(0, 200, 2)), sorted(unsync.map(lambda x: x * 2, range(100), window=8)))
+
+    def test_map_window(self):
+        lock = threading.Lock()
+        counts = {'current': 0, 'peak': 0, 'read': 0}
+
+        def items():
+            for i in range(50):
+                counts['read'] += 1
+                yield i
+
+        @unsync
+        async def work(value):
+            with lock:
+                counts['current'] += 1
+                counts['peak'] = max(counts['peak'], counts['current'])
+            await asyncio.sleep(0.01)
+            with lock:
+                counts['current'] -= 1
+            return value
+
+        results = unsync.map(work, items(), window=5)
+        next(results)
+        # The input is read lazily, only enough to refill the window
+        self.assertLessEqual(counts['read'], 6)
+        self.assertEqual(49, len(list(results)))
+        self.assertLessEqual(counts['peak'], 5)
+
+    def test_invalid_window(self):
+        for window in (0, -1):
+            with self.assertRaises(ValueError):
+                unsync.map(lambda x: x, range(5), window=window)
+            with self.assertRaises(ValueError):
+                unsync.as_completed([], window=window)
+
+    def test_map_exception(self):
+        def fail(value):
+            if value == 3:
+                raise ValueError(value)
+            return value
+
+        with self.assertRaises(ValueError):
+            list(unsync.map(fail, range(5), ordered=True))
+
+    def test_async_for(self):
+        @unsync
+        async def double(value):
+            await asyncio.sleep(0.01 * (5 - value))
+            return value * 2
+
+        @unsync
+        async def collect():
+            return [result async for result in unsync.map(double, range(5), window=2)]
+
+        self.assertEqual([0, 2, 4, 6, 8], sorted(collect().result()))
+
+    def test_as_completed(self):
+        @unsync
+        def sleep(duration):
+            time.sleep(duration)
+            return duration
+
+        tasks = [sleep(0.2), sleep(0.01), sleep(0.1)]
+        self.assertEqual([0.01, 0.1, 0.2], [task.result() for task in unsync.as_completed(tasks)])
+
+    def test_blocking_iteration_in_loop(self):
+        @unsync
+        async def blocking():
+            return list(unsync.as_completed([]))
+
+        with self.assertRaises(asyncio.InvalidStateError):
+            blocking().result()
@@ -0,0 +1,51 @@
+from unittest import TestCase, mock
+import os
+import sys
+import threading
+
+from unsync import unsync
+
+
+@unsync(parallel='interpreters')
+def where():
+    return os.getpid(), threading.current_thread().name
+
+
+class ParallelTests(TestCase):
+    def tearDown(self):
+        unsync._parallel_mode = None
+
+    def test_falls_back_to_processes(self):
+        with mock.patch.object(sys.modules['unsync.unsync'], '_detect_parallel_mode', return_value='processes'):
+            self.assertEqual('processes', unsync.parallel_mode)
+            pid, _ = where().result(10)
+        self.assertNotEqual(os.getpid(), pid)
+
+    def test_free_threaded(self):
+        with mock.patch('sys._is_gil_enabled', create=True, return_value=False):
+            self.assertEqual('threads', unsync.parallel_mode)
+        scale = 3
+
+        # Closures work since nothing is pickled
+        @unsync(parallel='interpreters')
+        def multiply(value):
+            return value * scale, threading.current_thread().name
+
+        result, thread = multiply(2).result(5)
+        self.assertEqual(6, result)
+        self.assertTrue(thread.startswith('unsync-parallel'))
+
+    def test_detects_mode(self):
+        self.assertIn(unsync.parallel_mode, ('threads', 'interpreters', 'processes'))
+
+    def test_unknown_mode(self):
+        with self.assertRaises(ValueError):
+            unsync(parallel='gpus')
+
+    def test_async_not_allowed(self):
+        @unsync(parallel='interpreters')
+        async def coroutine():
+            pass
+
+        with self.assertRaises(TypeError):
+            coroutine()
@@ -0,0 +1,134 @@
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from unittest import TestCase
+import asyncio
+import threading
+import time
+
+from unsync import unsync
+
+process_executor = ProcessPoolExecutor(1)
+
+
+@unsync(cpu_bound=True, executor=process_executor, priority=1)
+def process_job(value, duration=0):
+    time.sleep(duration)
+    return value, time.time()
+
+
+class PriorityTests(TestCase):
+    def setUp(self):
+        self.executor = ThreadPoolExecutor(1)
+        self.release = threading.Event()
+        self.order = []
+
+        @unsync(executor=self.executor, priority=1)
+        def job(value):
+            self.release.wait(5)
+            self.order.append(value)
+
+        self.job = job
+
+    def tearDown(self):
+        self.release.set()
+        self.executor.shutdown()
+        unsync.configure(starvation_limit=1.0)
+
+    def test_higher_priority_runs_first(self):
+        futures = [self.job('first')]
+        futures += [self.job('low') for _ in range(3)]
+        futures += [self.job.options(priority=0)('high') for _ in range(3)]
+        self.release.set()
+        for future in futures:
+            future.result(5)
+        self.assertEqual(['first'] + ['high'] * 3 + ['low'] * 3, self.order)
+
+    def test_equal_priorities_run_in_order(self):
+        futures = [self.job(value) for value in range(10)]
+        self.release.set()
+        for future in futures:
+            future.result(5)
+        self.assertEqual(list(range(10)), self.order)
+
+    def test_starvation_limit(self):
+        unsync.configure(starvation_limit=0.05)
+        futures = [self.job('first'), self.job.options(priority=5)('starved')]
+        time.sleep(0.1)
+        futures += [self.job.options(priority=0)('high') for _ in range(3)]
+        self.release.set()
+        for future in futures:
+            future.result(5)
+        self.assertEqual(['first', 'starved', 'high', 'high', 'high'], self.order)
+
+    def test_cancel_queued(self):
+        futures = [self.job('first'), self.job('cancelled'), self.job('second')]
+        self.assertTrue(futures[1].cancel())
+        self.release.set()
+        futures[0].result(5)
+        futures[2].result(5)
+        self.assertEqual(['first', 'second'], self.order)
+
+    def test_max_concurrency_coroutines(self):
+        order = []
+
+        @unsync(max_concurrency=1, priority=1)
+        async def limited(value):
+            await asyncio.sleep(0.01)
+            order.append(value)
+
+        futures = [limited('first')] + [limited('low') for _ in range(2)]
+        futures += [limited.options(priority=-1)('high') for _ in range(2)]
+        for future in futures:
+            future.result(5)
+        self.assertEqual(['first', 'high', 'high', 'low', 'low'], order)
+
+    def test_process_priority(self):
+        first = process_job('first', 0.5)
+        time.sleep(0.1)
+        low = process_job('low')
+        high = process_job.options(priority=0)('high')
+        self.assertLess(high.result(10)[1], low.result(10)[1])
+        self.assertEqual('first', first.result(10)[0])
+
+    def test_other_executors_unaffected(self):
+        self.job('first')
+
+        @unsync
+        def regular():
+            return threading.current_thread().name
+
+        regular().result(5)
+        self.assertIn(self.executor, unsync._dispatchers)
+        self.assertNotIn(unsync.thread_executor, unsync._dispatchers)
+
+    def test_options_priority_on_busy_executor(self):
+        executor = ThreadPoolExecutor(1)
+
+        @unsync(executor=executor)
+        def plain(value):
+            self.release.wait(5)
+            self.order.append(value)
+
+        futures = [plain('busy'), plain('queued')]
+        futures += [plain.options(priority=value)(value) for value in (5, 3, 1, 4)]
+        self.release.set()
+        for future in futures:
+            future.result(5)
+        self.assertEqual(['busy', 'queued', 1, 3, 4, 5], self.order)
+        executor.shutdown()
+
+    def test_declared_priority_orders_other_functions(self):
+        @unsync(executor=self.executor)
+        def bulk(value):
+            self.release.wait(5)
+            self.order.append(value)
+
+        futures = [bulk('first')] + [bulk('bulk') for _ in range(3)]
+        futures.append(self.job.options(priority=-1)('high'))
+        self.release.set()
+        for future in futures:
+            future.result(5)
+        self.assertEqual(['first', 'high'] + ['bulk'] * 3, self.order)
+
+    def test_unknown_option(self):
+        with self.assertRaises(TypeError):
+            self.job.options(retries=3)
@@ -1,7 +1,14 @@
-from unittest import TestCase
+from unittest import TestCase, mock
+import gc
+import os
+import pickle
+import sys
+import threading
 import time
+import weakref
 
 from unsync import unsync
+from unsync.unsync import _multiprocess_batch_target
 
 
 @unsync(cpu_bound=True)
@@ -13,6 +20,47 @@ def cpu_bound(duration):
     return 'faff'
 
 
+@unsync(cpu_bound=True, batch_size=16, batch_window_ms=5)
+def batched(value):
+    if value < 0:
+        raise ValueError(value)
+    return value * 2
+
+
+@unsync(cpu_bound=True, batch_size=16, batch_window_ms=200)
+def slow_window(value):
+    return value
+
+
+@unsync(cpu_bound=True, batch_size=4, batch_window_ms=5)
+def unpicklable(value):
+    if value:
+        return threading.Lock()
+    return 'faff'
+
+
+class Payload(object):
+    pass
+
+
+@unsync(cpu_bound=True)
+def echo(value):
+    return value
+
+
+@unsync(cpu_bound=True)
+def worker_state():
+    return os.getpid(), initialized, 'json' in sys.modules
+
+
+initialized = None
+
+
+def initialize(value):
+    global initialized
+    initialized = value
+
+
 class ProcessTests(TestCase):
     def test_raw_cpu_bound(self):
         cpu_bound(0.01).result()
@@ -31,3 +79,80 @@ class ProcessTests(TestCase):
         tasks = [cpu_bound(0.01) for _ in range(100)]
         self.assertTrue(all([result == 'faff' for result in aggregator(tasks).result()]))
         print(time.time() - start)
+
+    def test_arguments_released_without_gc(self):
+        argument = Payload()
+        reference = weakref.ref(argument)
+        gc.disable()
+        try:
+            self.assertIsInstance(echo(argument).result(), Payload)
+            del argument
+            # The pool drops its work item just after completing the call
+            deadline = time.time() + 2
+            while reference() is not None and time.time() < deadline:
+                time.sleep(0.01)
+            self.assertIsNone(reference())
+        finally:
+            gc.enable()
+
+    def test_batched_cpu_bound(self):
+        tasks = [batched(i) for i in range(100)]
+        self.assertEqual([i * 2 for i in range(100)], [task.result() for task in tasks])
+
+    def test_batched_partial_batch(self):
+        # Fewer calls than batch_size are flushed once the window elapses
+        self.assertEqual(6, batched(3).result(timeout=5))
+
+    def test_batched_exceptions_per_call(self):
+        tasks = [batched(i) for i in (1, -1, 2)]
+        self.assertEqual(2, tasks[0].result())
+        with self.assertRaises(ValueError):
+            tasks[1].result()
+        self.assertEqual(4, tasks[2].result())
+
+    def test_batched_burst_is_one_task(self):
+        executor = unsync.process_executor
+        with mock.patch.object(executor, 'submit', wraps=executor.submit) as submit:
+            tasks = [slow_window(i) for i in range(10)]
+            self.assertEqual(list(range(10)), [task.result() for task in tasks])
+        batches = [call for call in submit.call_args_list if call[0][0] is _multiprocess_batch_target]
+        self.assertEqual(1, len(batches))
+
+    def test_batched_unpicklable_result_fails_one_call(self):
+        tasks = [unpicklable(i) for i in (0, 1, 0)]
+        self.assertEqual('faff', tasks[0].result())
+        with self.assertRaises(pickle.PicklingError):
+            tasks[1].result()
+        self.assertEqual('faff', tasks[2].result())
+
+
+class ProcessPoolTests(TestCase):
+    def tearDown(self):
+        unsync._processes = None
+        unsync._preload = ()
+        unsync._process_initializer = None
+        unsync._process_initargs = ()
+        unsync._max_tasks_per_child = None
+        unsync.process_executor.shutdown()
+        unsync._process_executor = None
+
+    def test_warm_up(self):
+        pids = unsync.warm_up(processes=2, preload=['json'])
+        self.assertEqual(2, len(pids))
+        pid, _, preloaded = worker_state().result()
+        self.assertIn(pid, pids)
+        self.assertTrue(preloaded)
+
+    def test_initializer(self):
+        unsync.configure(process_initializer=initialize, process_initargs=('faff',))
+        self.assertEqual('faff', worker_state().result()[1])
+
+    def test_max_tasks_per_child(self):
+        if sys.version_info < (3, 11):
+            with self.assertRaises(ValueError):
+                unsync.configure(max_tasks_per_child=1)
+            self.assertIsNone(unsync._max_tasks_per_child)
+            return
+        unsync.configure(processes=1, max_tasks_per_child=1)
+        pids = [worker_state().result()[0] for _ in range(3)]
+        self.assertEqual(3, len(set(pids)))
@@ -0,0 +1,103 @@
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+from unittest import TestCase
+import asyncio
+import threading
+import time
+
+from unsync import unsync, RateLimit
+
+
+class RateLimitTests(TestCase):
+    def test_parse(self):
+        self.assertEqual(100, RateLimit('100/s').rate)
+        self.assertEqual(10, RateLimit('600/m').rate)
+        self.assertEqual(2, RateLimit(2).rate)
+        with self.assertRaises(ValueError):
+            RateLimit('100/fortnight')
+
+    def test_bucket(self):
+        limit = RateLimit('10/s', burst=2)
+        self.assertEqual(0, limit.reserve())
+        self.assertEqual(0, limit.reserve())
+        self.assertAlmostEqual(0.1, limit.reserve(), places=2)
+        self.assertAlmostEqual(0.2, limit.reserve(), places=2)
+        limit.refund()
+        self.assertAlmostEqual(0.2, limit.reserve(), places=2)
+
+    def test_throttles_thread_function(self):
+        @unsync(rate_limit='20/s', burst=5)
+        def call():
+            return time.monotonic()
+
+        start = time.monotonic()
+        times = [future.result(5) for future in [call() for _ in range(15)]]
+        # 5 calls in the burst, then one every 50 ms
+        self.assertGreater(max(times) - start, 0.45)
+        self.assertLess(max(times) - start, 1.5)
+        self.assertLess(sorted(times)[4] - start, 0.1)
+
+    def test_throttles_coroutine(self):
+        @unsync(rate_limit=RateLimit('20/s', burst=1))
+        async def call():
+            return time.monotonic()
+
+        times = [future.result(5) for future in [call() for _ in range(5)]]
+        self.assertGreater(max(times) - min(times), 0.15)
+
+    def test_shared_limit(self):
+        limit = RateLimit('20/s', burst=1)
+
+        @unsync(rate_limit=limit)
+        def first():
+            return time.monotonic()
+
+        @unsync(rate_limit=limit)
+        async def second():
+            return time.monotonic()
+
+        futures = [first() if i % 2 else second() for i in range(6)]
+        times = [future.result(5) for future in futures]
+        self.assertGreater(max(times) - min(times), 0.2)
+
+    def test_waiting_calls_hold_no_thread(self):
+        executor = ThreadPoolExecutor(1)
+
+        @unsync(rate_limit=RateLimit('5/s', burst=1), executor=executor)
+        def throttled():
+            return threading.current_thread()
+
+        @unsync(executor=executor)
+        def other():
+            return time.monotonic()
+
+        futures = [throttled() for _ in range(3)]
+        start = time.monotonic()
+        self.assertLess(other().result(5) - start, 0.1)
+        for future in futures:
+            future.result(5)
+        executor.shutdown()
+
+    def test_cancel_waiting_call(self):
+        limit = RateLimit('5/s', burst=1)
+        calls = []
+
+        @unsync(rate_limit=limit)
+        def call():
+            calls.append(1)
+
+        call().result(5)
+        waiting = call()
+        self.assertTrue(waiting.cancel())
+        with self.assertRaises(CancelledError):
+            waiting.result(5)
+        time.sleep(0.3)
+        self.assertEqual(1, len(calls))
+
+    def test_timeout_includes_throttling(self):
+        @unsync(rate_limit=RateLimit('1/s', burst=1), timeout=0.1)
+        async def call():
+            return 'faff'
+
+        self.assertEqual('faff', call().result(5))
+        with self.assertRaises(asyncio.TimeoutError):
+            call().result(5)
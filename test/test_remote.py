@@ -0,0 +1,150 @@
+from concurrent.futures import CancelledError
+from unittest import TestCase
+import os
+import socket
+import subprocess
+import sys
+import time
+
+from unsync import unsync
+from unsync.remote import RemoteExecutor, RemoteWorkerLost
+from unsync.unsync import _shared_arguments
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+AUTHKEY = 'test-secret'
+
+
+@unsync(cpu_bound=True, executor='remote')
+def server_pid(duration=0):
+    time.sleep(duration)
+    return os.getppid()
+
+
+@unsync(cpu_bound=True, executor='remote', shared_memory=1024)
+def remote_echo(data):
+    time.sleep(0.2)
+    return data
+
+
+@unsync(cpu_bound=True, executor='remote')
+def fail():
+    raise ValueError('remote failure')
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('localhost', 0))
+        return sock.getsockname()[1]
+
+
+def start_worker(port):
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'unsync.remote', '--host', 'localhost', '--port', str(port), '--workers', '2',
+         '--authkey', AUTHKEY], cwd=ROOT, stdout=subprocess.PIPE)
+    process.stdout.readline()
+    return process
+
+
+def stop_worker(process):
+    process.terminate()
+    process.wait(10)
+    process.stdout.close()
+
+
+def wait_for(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError('Timed out')
+        time.sleep(0.02)
+
+
+class RemoteTests(TestCase):
+    def setUp(self):
+        self.ports = [free_port(), free_port()]
+        self.workers = [start_worker(port) for port in self.ports]
+        self.executor = RemoteExecutor(['localhost:%d' % port for port in self.ports], AUTHKEY,
+                                       reconnect_interval=0.05)
+        unsync.configure(executors={'remote': self.executor})
+
+    def tearDown(self):
+        self.executor.shutdown()
+        for worker in self.workers:
+            stop_worker(worker)
+
+    def test_results_and_exceptions(self):
+        self.assertIn(server_pid().result(10), [worker.pid for worker in self.workers])
+        with self.assertRaises(ValueError):
+            fail().result(10)
+
+    def test_load_balancing(self):
+        futures = [server_pid(0.2) for _ in range(4)]
+        self.assertEqual({worker.pid for worker in self.workers}, {future.result(10) for future in futures})
+
+    def test_await(self):
+        @unsync
+        async def gather():
+            return [await server_pid() for _ in range(3)]
+
+        self.assertEqual(3, len(gather().result(10)))
+
+    def test_cancel_queued(self):
+        running = [server_pid(0.5) for _ in range(4)]
+        queued = server_pid()
+        self.assertTrue(queued.cancel())
+        with self.assertRaises(CancelledError):
+            queued.result(10)
+        for future in running:
+            future.result(10)
+
+    def test_reconnect(self):
+        in_flight = server_pid(2)
+        busy = self.workers[0].pid if self.executor._workers[0].in_flight else self.workers[1].pid
+        index = [worker.pid for worker in self.workers].index(busy)
+        stop_worker(self.workers[index])
+        with self.assertRaises(RemoteWorkerLost):
+            in_flight.result(10)
+        wait_for(lambda: self.executor.connected == 1)
+        self.assertEqual(self.workers[1 - index].pid, server_pid().result(10))
+
+        self.workers[index] = start_worker(self.ports[index])
+        wait_for(lambda: self.executor.connected == 2)
+        futures = [server_pid(0.2) for _ in range(4)]
+        self.assertIn(self.workers[index].pid, {future.result(10) for future in futures})
+
+    def test_waits_for_a_worker(self):
+        for worker in self.workers:
+            stop_worker(worker)
+        wait_for(lambda: self.executor.connected == 0)
+        future = server_pid()
+        time.sleep(0.1)
+        self.assertFalse(future.done())
+        self.workers = [start_worker(port) for port in self.ports]
+        self.assertIn(future.result(10), [worker.pid for worker in self.workers])
+
+    def test_shutdown_waits_for_calls(self):
+        in_flight = server_pid(0.5)
+        self.executor.shutdown(wait=True)
+        self.assertIn(in_flight.result(0), [worker.pid for worker in self.workers])
+        with self.assertRaises(RuntimeError):
+            server_pid().result(10)
+
+    def test_shutdown_cancels_backlog(self):
+        for worker in self.workers:
+            stop_worker(worker)
+        wait_for(lambda: self.executor.connected == 0)
+        queued = server_pid()
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        with self.assertRaises(CancelledError):
+            queued.result(0)
+        self.workers = [start_worker(port) for port in self.ports]
+
+    def test_shared_memory_is_pickled(self):
+        data = b'faff' * 1024
+        future = remote_echo(data)
+        self.assertEqual({}, _shared_arguments.files)
+        self.assertEqual(data, future.result(10))
+
+    def test_requires_authkey(self):
+        with self.assertRaises(ValueError):
+            RemoteExecutor(['localhost:%d' % self.ports[0]])
@@ -0,0 +1,170 @@
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+from unittest import TestCase, mock
+import asyncio
+import threading
+import time
+
+from unsync import unsync, Retry
+from unsync.retry import Hedge
+
+
+class Flaky(object):
+    def __init__(self, failures):
+        self.failures = failures
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def __call__(self):
+        with self.lock:
+            self.calls += 1
+            if self.calls <= self.failures:
+                raise ConnectionError(self.calls)
+        return 'faff'
+
+
+class RetryTests(TestCase):
+    def test_retry_thread_function(self):
+        flaky = Flaky(2)
+
+        @unsync(retry=Retry(3, backoff=0.001))
+        def call():
+            return flaky()
+
+        self.assertEqual('faff', call().result(5))
+        self.assertEqual(3, flaky.calls)
+
+    def test_retry_coroutine(self):
+        flaky = Flaky(1)
+
+        @unsync(retry=Retry(3, backoff=0.001))
+        async def call():
+            return flaky()
+
+        self.assertEqual('faff', call().result(5))
+        self.assertEqual(2, flaky.calls)
+
+    def test_gives_up(self):
+        flaky = Flaky(10)
+
+        @unsync(retry=Retry(2, backoff=0.001))
+        def call():
+            return flaky()
+
+        with self.assertRaises(ConnectionError):
+            call().result(5)
+        self.assertEqual(3, flaky.calls)
+
+    def test_only_listed_exceptions(self):
+        @unsync(retry=Retry(3, exceptions=(ConnectionError,)))
+        def call():
+            raise ValueError()
+
+        with self.assertRaises(ValueError):
+            call().result(5)
+
+    def test_cancelled_not_retried(self):
+        calls = []
+
+        @unsync(retry=Retry(3, backoff=0.001))
+        async def call():
+            calls.append(1)
+            raise asyncio.CancelledError()
+
+        with self.assertRaises(CancelledError):
+            call().result(5)
+        self.assertEqual(1, len(calls))
+
+    def test_backoff_does_not_hold_threads(self):
+        executor = ThreadPoolExecutor(1)
+        flaky = Flaky(1)
+
+        @unsync(retry=Retry(1, backoff=1), executor=executor)
+        def call():
+            return flaky()
+
+        @unsync(executor=executor)
+        def other():
+            return time.time()
+
+        with mock.patch('random.uniform', side_effect=lambda low, high: high):
+            future = call()
+            time.sleep(0.1)
+            # The only worker is free while the retry waits
+            done = other().result(5)
+            self.assertEqual('faff', future.result(5))
+        self.assertLess(done, time.time() - 0.5)
+        executor.shutdown()
+
+    def test_jitter(self):
+        retry = Retry(5, backoff=0.1, max_backoff=1)
+        with mock.patch('random.uniform', side_effect=lambda low, high: high):
+            self.assertEqual([0.1, 0.2, 0.4, 0.8, 1], [retry.delay(attempt) for attempt in range(5)])
+
+
+class HedgeTests(TestCase):
+    def test_hedged_call_wins(self):
+        calls = []
+
+        @unsync(hedge_after_ms=50)
+        async def call():
+            calls.append(time.time())
+            # Only the first attempt is slow
+            await asyncio.sleep(5 if len(calls) == 1 else 0)
+            return len(calls)
+
+        start = time.time()
+        self.assertEqual(2, call().result(5))
+        self.assertLess(time.time() - start, 1)
+        self.assertEqual(2, len(calls))
+
+    def test_fast_call_not_hedged(self):
+        calls = []
+
+        @unsync(hedge_after_ms=500)
+        def call():
+            calls.append(1)
+            return 'faff'
+
+        self.assertEqual('faff', call().result(5))
+        self.assertEqual(1, len(calls))
+
+    def test_loser_cancelled(self):
+        cancelled = []
+
+        @unsync(hedge_after_ms=20)
+        async def call(durations):
+            try:
+                await asyncio.sleep(durations.pop(0))
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+            return 'faff'
+
+        self.assertEqual('faff', call([5, 0]).result(5))
+        time.sleep(0.1)
+        self.assertEqual([True], cancelled)
+
+    def test_cancelled_attempt_not_retried(self):
+        calls = []
+
+        @unsync(retry=Retry(3, backoff=0.001), hedge_after_ms=500)
+        async def call():
+            calls.append(1)
+            raise asyncio.CancelledError()
+
+        with self.assertRaises(CancelledError):
+            call().result(5)
+        self.assertEqual(1, len(calls))
+
+    def test_percentile(self):
+        hedge = Hedge('p90', min_samples=10)
+        self.assertIsNone(hedge.delay())
+        for latency in range(100):
+            hedge.record(latency / 1000)
+        self.assertAlmostEqual(0.09, hedge.delay())
+
+    def test_percentile_window(self):
+        hedge = Hedge('p50', window=10, min_samples=1)
+        for latency in range(100):
+            hedge.record(latency)
+        self.assertEqual(95, hedge.delay())
@@ -0,0 +1,100 @@
+from unittest import TestCase, skipUnless
+import glob
+import os
+import tempfile
+import time
+
+from unsync import unsync
+from unsync.unsync import _shared_arguments
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+@unsync(cpu_bound=True, shared_memory=1024)
+def describe(data):
+    return type(data).__name__, len(data), bytes(data[:4])
+
+
+@unsync(cpu_bound=True, shared_memory=1024)
+def slow_len(data):
+    time.sleep(0.2)
+    return len(data)
+
+
+@unsync(cpu_bound=True, shared_memory=1024)
+def describe_later(data, delay):
+    time.sleep(delay)
+    return bytes(data[:4])
+
+
+@unsync(cpu_bound=True, shared_memory=1024)
+def repeat(data, count):
+    return data * count
+
+
+@unsync(cpu_bound=True, shared_memory=1024)
+def modify(data):
+    data[0] = 0
+    return bytes(data[:1])
+
+
+@unsync(cpu_bound=True, shared_memory=1024)
+def array_sum(array):
+    return array.sum(), array * 2
+
+
+def shared_files():
+    directory = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+    return glob.glob(os.path.join(directory, 'unsync-*'))
+
+
+class SharedMemoryTests(TestCase):
+    def test_argument_types(self):
+        data = b'faff' * 1024
+        self.assertEqual(('bytes', 4096, b'faff'), describe(data).result())
+        self.assertEqual(('bytearray', 4096, b'faff'), describe(bytearray(data)).result())
+        self.assertEqual(('memoryview', 4096, b'faff'), describe(memoryview(data)).result())
+
+    def test_small_arguments_are_pickled(self):
+        self.assertEqual(('bytes', 4, b'faff'), describe(b'faff').result())
+
+    def test_result(self):
+        result = repeat(b'faff', 1024).result()
+        self.assertEqual(b'faff' * 1024, result)
+        self.assertEqual(bytearray(b'faff' * 512), repeat(bytearray(b'faff' * 256), 2).result())
+
+    def test_worker_modifications_are_private(self):
+        data = bytearray(b'faff' * 1024)
+        self.assertEqual(b'\0', modify(data).result())
+        self.assertEqual(b'f', bytes(data[:1]))
+
+    def test_mutable_buffer_changed_between_calls(self):
+        data = bytearray(b'faff' * 1024)
+        first = describe_later(data, 0.2)
+        data[:4] = b'beef'
+        self.assertEqual(b'faff', first.result())
+        self.assertEqual(b'beef', describe_later(data, 0).result())
+
+    def test_reference_counted_cleanup(self):
+        before = set(shared_files())
+        data = b'faff' * 1024
+        tasks = [slow_len(data) for _ in range(5)]
+        self.assertEqual(1, len(_shared_arguments.files))
+        self.assertEqual(1, len(set(shared_files()) - before))
+        [task.result() for task in tasks]
+        # The files are removed from completion callbacks, which run just after result() returns
+        deadline = time.time() + 1
+        while _shared_arguments.files and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual({}, _shared_arguments.files)
+        self.assertEqual(before, set(shared_files()))
+
+    @skipUnless(numpy, 'requires numpy')
+    def test_numpy(self):
+        array = numpy.arange(1024, dtype=numpy.int64).reshape(32, 32)
+        total, doubled = array_sum(array).result()
+        self.assertEqual(array.sum(), total)
+        self.assertTrue((doubled == array * 2).all())
@@ -0,0 +1,112 @@
+from unittest import TestCase
+import asyncio
+import time
+
+from unsync import unsync
+
+
+@unsync(cpu_bound=True)
+def cpu_bound_sleep(duration):
+    time.sleep(duration)
+    return 'faff'
+
+
+class StatsTests(TestCase):
+    def setUp(self):
+        self.records = []
+        unsync.configure(stats=True)
+        unsync.add_hook(self.records.append)
+
+    def tearDown(self):
+        unsync.remove_hook(self.records.append)
+        unsync.configure(stats=False)
+
+    def wait_for_records(self, count):
+        # Hooks are called on the loop after the result is available
+        deadline = time.time() + 2
+        while len(self.records) < count and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(count, len(self.records))
+
+    def test_async_stats(self):
+        @unsync
+        async def sleep():
+            await asyncio.sleep(0.1)
+
+        [task.result() for task in [sleep() for _ in range(3)]]
+        self.wait_for_records(3)
+        stats = unsync.stats()['functions'][sleep._stats_name]
+        self.assertEqual(3, stats['calls'])
+        self.assertEqual(0, stats['in_flight'])
+        self.assertGreaterEqual(stats['run_time']['mean'], 0.09)
+        self.assertGreaterEqual(stats['latency']['max'], stats['run_time']['max'])
+
+    def test_thread_queue_wait(self):
+        @unsync(max_concurrency=1)
+        def sleep():
+            time.sleep(0.1)
+
+        [task.result() for task in [sleep() for _ in range(2)]]
+        self.wait_for_records(2)
+        self.assertGreaterEqual(max(record.queue_wait for record in self.records), 0.09)
+        self.assertTrue(all(record.run_time >= 0.09 for record in self.records))
+
+    def test_cpu_bound_stats(self):
+        cpu_bound_sleep(0.1).result()
+        self.wait_for_records(1)
+        self.assertGreaterEqual(self.records[0].run_time, 0.09)
+        self.assertGreaterEqual(self.records[0].latency, self.records[0].run_time)
+
+    def test_exception_record(self):
+        @unsync
+        def fail():
+            raise ValueError()
+
+        with self.assertRaises(ValueError):
+            fail().result()
+        self.wait_for_records(1)
+        self.assertIsInstance(self.records[0].exception, ValueError)
+        self.assertEqual(1, unsync.stats()['functions'][fail._stats_name]['failed'])
+
+    def test_stream_stats(self):
+        @unsync
+        def numbers():
+            yield 1
+            raise ValueError()
+
+        stream = numbers()
+        self.assertEqual(1, next(stream))
+        with self.assertRaises(ValueError):
+            next(stream)
+        self.wait_for_records(1)
+        self.assertIsInstance(self.records[0].exception, ValueError)
+        stats = unsync.stats()['functions'][numbers._stats_name]
+        self.assertEqual((1, 0, 1), (stats['calls'], stats['in_flight'], stats['failed']))
+
+    def test_rejected_call_not_counted(self):
+        @unsync(cpu_bound=True)
+        async def bad():
+            pass
+
+        for _ in range(2):
+            with self.assertRaises(TypeError):
+                bad()
+        self.assertNotIn(bad._stats_name, unsync.stats()['functions'])
+
+    def test_loop_lag(self):
+        @unsync
+        async def block():
+            time.sleep(0.3)
+
+        block().result()
+        self.assertGreater(max(lag['max'] for lag in unsync.stats()['loop_lag']), 0.1)
+
+
+class DisabledStatsTests(TestCase):
+    def test_disabled(self):
+        @unsync
+        def work():
+            return 'faff'
+
+        self.assertEqual('faff', work().result())
+        self.assertNotIn(work._stats_name, unsync.stats()['functions'])
@@ -0,0 +1,211 @@
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+from unittest import TestCase
+import asyncio
+import threading
+import time
+
+from unsync import unsync, LRU, Unstream
+
+
+@unsync(cpu_bound=True, chunk_size=4)
+def process_numbers(count):
+    for value in range(count):
+        yield value
+
+
+@unsync(cpu_bound=True, chunk_size=4)
+def process_failure():
+    yield 1
+    raise ValueError('faff')
+
+
+@unsync(cpu_bound=True)
+def process_slow():
+    yield 'first'
+    start = time.time()
+    while time.time() - start < 10 and not unsync.cancelled():
+        time.sleep(0.01)
+    yield 'second'
+
+
+class StreamTests(TestCase):
+    def test_async_generator(self):
+        @unsync
+        async def numbers(count):
+            for value in range(count):
+                await asyncio.sleep(0)
+                yield value
+
+        stream = numbers(100)
+        self.assertIsInstance(stream, Unstream)
+        self.assertEqual(list(range(100)), list(stream))
+
+    def test_async_for(self):
+        @unsync
+        async def numbers(count):
+            for value in range(count):
+                yield value
+
+        @unsync
+        def thread_numbers(count):
+            for value in range(count):
+                yield value
+
+        @unsync
+        async def consume():
+            return [value async for value in numbers(10)], [value async for value in thread_numbers(10)]
+
+        self.assertEqual((list(range(10)), list(range(10))), consume().result(5))
+
+    def test_generator_runs_in_thread(self):
+        @unsync
+        def threads():
+            for _ in range(3):
+                yield threading.current_thread()
+
+        for thread in threads():
+            self.assertIsNot(unsync.thread, thread)
+            self.assertIsNot(threading.current_thread(), thread)
+
+    def test_backpressure(self):
+        produced = []
+
+        @unsync(buffer_size=4)
+        def numbers():
+            for value in range(100):
+                produced.append(value)
+                yield value
+
+        stream = numbers()
+        time.sleep(0.2)
+        # The buffer is full, and the producer waits with one more item
+        self.assertEqual(5, len(produced))
+        self.assertEqual(list(range(100)), list(stream))
+
+    def test_first_items_arrive_early(self):
+        @unsync
+        def slow():
+            yield 'first'
+            time.sleep(0.5)
+            yield 'second'
+
+        start = time.time()
+        stream = slow()
+        self.assertEqual('first', next(stream))
+        self.assertLess(time.time() - start, 0.4)
+        self.assertEqual(['second'], list(stream))
+
+    def test_exception(self):
+        @unsync
+        async def failing():
+            yield 1
+            raise ValueError('faff')
+
+        stream = failing()
+        self.assertEqual(1, next(stream))
+        with self.assertRaises(ValueError):
+            next(stream)
+
+    def test_cancel(self):
+        closed = threading.Event()
+
+        @unsync(buffer_size=2)
+        def endless():
+            try:
+                while True:
+                    yield 'faff'
+            finally:
+                closed.set()
+
+        stream = endless()
+        self.assertEqual('faff', next(stream))
+        self.assertTrue(stream.cancel())
+        self.assertTrue(closed.wait(5))
+        with self.assertRaises(CancelledError):
+            next(stream)
+
+    def test_abandoned_stream_frees_worker(self):
+        executor = ThreadPoolExecutor(1)
+        closed = threading.Event()
+
+        @unsync(executor=executor, buffer_size=2)
+        def endless():
+            try:
+                while True:
+                    yield 'faff'
+            finally:
+                closed.set()
+
+        for value in endless():
+            break
+        self.assertTrue(closed.wait(5))
+        self.assertEqual('free', executor.submit(lambda: 'free').result(5))
+        executor.shutdown()
+
+    def test_close(self):
+        closed = threading.Event()
+
+        @unsync(buffer_size=2)
+        def endless():
+            try:
+                while True:
+                    yield 'faff'
+            finally:
+                closed.set()
+
+        with endless() as stream:
+            self.assertEqual('faff', next(stream))
+        self.assertTrue(closed.wait(5))
+
+    def test_blocking_iteration_in_loop(self):
+        @unsync
+        async def numbers():
+            yield 1
+
+        @unsync
+        async def consume():
+            return list(numbers())
+
+        with self.assertRaises(asyncio.InvalidStateError):
+            consume().result(5)
+
+
+class ProcessStreamTests(TestCase):
+    def test_unsupported_options(self):
+        for options in ({'cache': LRU()}, {'retry': 3}, {'hedge_after_ms': 50}, {'timeout': 0.1}, {'priority': 1},
+                        {'max_concurrency': 2}, {'rate_limit': '10/s'}, {'batch_size': 8}):
+            with self.assertRaises(TypeError):
+                @unsync(**options)
+                def numbers():
+                    yield 1
+
+            with self.assertRaises(TypeError):
+                @unsync(**options)
+                async def async_numbers():
+                    yield 1
+
+    def test_process_generator(self):
+        self.assertEqual(list(range(1000)), list(process_numbers(1000)))
+
+    def test_process_exception(self):
+        stream = process_failure()
+        self.assertEqual(1, next(stream))
+        with self.assertRaises(ValueError):
+            next(stream)
+
+    def test_process_first_items_arrive_early(self):
+        stream = process_slow()
+        start = time.time()
+        self.assertEqual('first', next(stream))
+        self.assertLess(time.time() - start, 5)
+        self.assertTrue(stream.cancel())
+        # The worker stops producing once it checks unsync.cancelled()
+        stream._channel.producer.result(5)
+
+    def test_abandoned_process_stream(self):
+        stream = process_slow()
+        self.assertEqual('first', next(stream))
+        channel = stream._channel
+        del stream
+        # The worker stops producing once it checks unsync.cancelled()
+        channel.producer.result(5)
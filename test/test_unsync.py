@@ -89,6 +89,25 @@ class DecoratorTests(TestCase):
 
         self.assertEqual('faff', Class().wait().result())
 
+    def test_bound_methods(self):
+        class Class:
+            def __init__(self, value):
+                self.value = value
+
+            @unsync
+            def get(self, suffix=''):
+                """Docstring"""
+                return self.value + suffix
+
+        instance = Class('faff')
+        self.assertEqual('faffderp', instance.get('derp').result())
+        self.assertEqual('faff', instance.get.options(priority=0)().result())
+        self.assertEqual('faff', Class.get(instance).result())
+        self.assertEqual('get', instance.get.__name__)
+        self.assertEqual('Docstring', instance.get.__doc__)
+        self.assertEqual(instance.get, instance.get)
+        self.assertNotEqual(instance.get, Class('faff').get)
+
     def test_passing_arguments(self):
         @unsync(faff='faff')
         def cpu_bound():
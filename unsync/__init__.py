@@ -1,3 +1,23 @@
-from unsync.unsync import unsync, Unfuture
+import importlib
 
-__all__ = ["unsync", "Unfuture"]
+from unsync.unsync import unsync, Unfuture, Unstream
+from unsync.cache import LRU
+from unsync.ratelimit import RateLimit
+from unsync.stats import CallRecord
+
+# Imported on first use, as they import asyncio or concurrent.futures
+_LAZY = {
+    'AdaptiveThreadPoolExecutor': 'unsync.executor',
+    'Graph': 'unsync.graph',
+    'Retry': 'unsync.retry',
+}
+
+
+def __getattr__(name):
+    if name in _LAZY:
+        return getattr(importlib.import_module(_LAZY[name]), name)
+    raise AttributeError('module %r has no attribute %r' % (__name__, name))
+
+
+__all__ = ["unsync", "Unfuture", "Unstream", "CallRecord", "LRU", "AdaptiveThreadPoolExecutor", "Retry", "RateLimit",
+           "Graph"]
@@ -0,0 +1,51 @@
+import collections
+import threading
+import time
+
+
+class LRU(object):
+    """
+    Result cache for @unsync(cache=LRU(maxsize, ttl)).
+    Holds the Unfutures of up to `maxsize` calls, evicting the least recently used first.
+    Calls still in flight are shared by identical calls, and completed results expire `ttl` seconds after completion.
+    Failed calls are not cached. Each caller gets an Unfuture of its own, so cancelling it leaves the shared call
+    running.
+    """
+    def __init__(self, maxsize=128, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        # key -> [Unfuture, expiry], the expiry is None while in flight or without a ttl
+        self.entries = collections.OrderedDict()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def get_or_call(self, key, call):
+        """Returns a view of the cached Unfuture for `key`, or of the Unfuture returned by `call()` after caching it"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and (entry[1] is None or time.monotonic() < entry[1]):
+                self.entries.move_to_end(key)
+                return entry[0]._view()
+            unfuture = call()
+            self.entries[key] = [unfuture, None]
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+        unfuture._add_done_callback(lambda future: self._completed(key, unfuture, future))
+        return unfuture._view()
+
+    def _completed(self, key, unfuture, future):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] is not unfuture:
+                return
+            if future.cancelled() or future.exception() is not None:
+                del self.entries[key]
+            elif self.ttl is not None:
+                entry[1] = time.monotonic() + self.ttl
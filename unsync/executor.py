@@ -0,0 +1,140 @@
+import collections
+import concurrent.futures
+import os
+import threading
+import time
+
+
+class AdaptiveThreadPoolExecutor(concurrent.futures.Executor):
+    """
+    A thread pool that sizes itself to its load, between `min_workers` and `max_workers`.
+    A worker is added whenever the oldest queued call has waited more than `target_wait` seconds with no worker
+    free to take it, and workers left idle for `idle_timeout` seconds exit, down to `min_workers`.
+    """
+    def __init__(self, min_workers=1, max_workers=None, target_wait=0.005, idle_timeout=5.0,
+                 thread_name_prefix='unsync-adaptive'):
+        if max_workers is None:
+            max_workers = min(64, (os.cpu_count() or 1) * 8)
+        if not 0 <= min_workers <= max_workers or max_workers < 1:
+            raise ValueError('Expected 0 <= min_workers <= max_workers and max_workers >= 1')
+        self.min_workers = min_workers
+        self.max_workers = max_workers
+        self.target_wait = target_wait
+        self.idle_timeout = idle_timeout
+        self.thread_name_prefix = thread_name_prefix
+        self._lock = threading.Lock()
+        self._work_ready = threading.Condition(self._lock)
+        self._growth = threading.Condition(self._lock)
+        self._queue = collections.deque()
+        self._threads = set()
+        self._idle = 0
+        self._monitor = None
+        self._shutdown = False
+        self._completed = 0
+        self._thread_count = 0
+
+    @property
+    def size(self):
+        """The current number of worker threads"""
+        return len(self._threads)
+
+    @property
+    def queue_depth(self):
+        """The number of calls waiting for a worker"""
+        return len(self._queue)
+
+    def snapshot(self):
+        with self._lock:
+            oldest = self._queue[0][4] if self._queue else None
+            return {
+                'size': len(self._threads),
+                'idle': self._idle,
+                'queue_depth': len(self._queue),
+                'queue_wait': 0.0 if oldest is None else time.perf_counter() - oldest,
+                'completed': self._completed,
+            }
+
+    def submit(self, fn, *args, **kwargs):
+        future = concurrent.futures.Future()
+        with self._lock:
+            if self._shutdown:
+                raise RuntimeError('cannot schedule new futures after shutdown')
+            self._queue.append((future, fn, args, kwargs, time.perf_counter()))
+            if len(self._queue) <= self._idle:
+                self._work_ready.notify()
+            elif not self._threads or len(self._threads) < self.min_workers:
+                self._add_worker()
+            elif len(self._threads) < self.max_workers:
+                self._watch()
+        return future
+
+    def _add_worker(self):
+        # Must hold self._lock
+        self._thread_count += 1
+        thread = threading.Thread(
+            target=self._work, name='{}_{}'.format(self.thread_name_prefix, self._thread_count), daemon=True)
+        self._threads.add(thread)
+        thread.start()
+
+    def _watch(self):
+        # Must hold self._lock, wakes the monitor thread to check the queue wait
+        if self._monitor is None:
+            self._monitor = threading.Thread(
+                target=self._monitor_queue, name='{}_monitor'.format(self.thread_name_prefix), daemon=True)
+            self._monitor.start()
+        else:
+            self._growth.notify()
+
+    def _monitor_queue(self):
+        with self._lock:
+            while not self._shutdown:
+                timeout = None
+                if len(self._queue) > self._idle and len(self._threads) < self.max_workers:
+                    waited = time.perf_counter() - self._queue[0][4]
+                    if waited >= self.target_wait:
+                        self._add_worker()
+                        # Give the new worker a chance to take a call before checking again
+                        timeout = self.target_wait
+                    else:
+                        timeout = self.target_wait - waited
+                self._growth.wait(timeout)
+
+    def _work(self):
+        thread = threading.current_thread()
+        while True:
+            with self._lock:
+                while not self._queue:
+                    if self._shutdown:
+                        self._threads.discard(thread)
+                        return
+                    self._idle += 1
+                    notified = self._work_ready.wait(self.idle_timeout)
+                    self._idle -= 1
+                    if not notified and not self._queue and len(self._threads) > self.min_workers:
+                        self._threads.discard(thread)
+                        return
+                future, fn, args, kwargs, _ = self._queue.popleft()
+            if future.set_running_or_notify_cancel():
+                try:
+                    result = fn(*args, **kwargs)
+                except BaseException as exc:
+                    future.set_exception(exc)
+                else:
+                    future.set_result(result)
+            # Drop references to the call before waiting for the next one
+            del future, fn, args, kwargs
+            with self._lock:
+                self._completed += 1
+
+    def shutdown(self, wait=True, *, cancel_futures=False):
+        with self._lock:
+            self._shutdown = True
+            if cancel_futures:
+                while self._queue:
+                    self._queue.popleft()[0].cancel()
+            threads = list(self._threads)
+            self._work_ready.notify_all()
+            self._growth.notify_all()
+        if wait:
+            for thread in threads:
+                thread.join()
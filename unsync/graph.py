@@ -0,0 +1,206 @@
+import concurrent.futures
+import threading
+
+from unsync.unsync import unsync, Unfuture, _multiprocess_chain_target, _PreviousResult
+
+
+class Node(object):
+    """A call in a Graph, whose Node arguments are replaced by the results of those nodes"""
+    def __init__(self, graph, func, args, kwargs):
+        self.graph = graph
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.dependencies = []
+        for value in list(args) + list(kwargs.values()):
+            if isinstance(value, Node) and value not in self.dependencies:
+                if value.graph is not graph:
+                    raise ValueError('Nodes of another graph may not be used as arguments')
+                self.dependencies.append(value)
+
+    def __repr__(self):
+        return '<Node %s>' % getattr(self.func, '__name__', self.func)
+
+
+class Graph(object):
+    """
+    A set of calls to @unsync functions depending on each other's results:
+        graph = Graph()
+        raw = graph.add(load, path)
+        report = graph.add(summarize, graph.add(parse, raw), title)
+        report_future, = graph.submit(report)
+    Each call starts as soon as the results it depends on are ready, from the thread that completed the last of them.
+    Chains of cpu_bound calls, each the only user of the previous one's result, run as a single job in the process
+    pool so intermediate results are never sent back. Results are released once every call using them started.
+    """
+    def __init__(self):
+        self.nodes = []
+
+    def add(self, func, *args, **kwargs):
+        node = Node(self, func, args, kwargs)
+        self.nodes.append(node)
+        return node
+
+    def submit(self, *outputs):
+        """
+        Runs the nodes needed for `outputs`, every node no other depends on by default,
+        returning an Unfuture for each output in order
+        """
+        if not outputs:
+            used = {dependency for node in self.nodes for dependency in node.dependencies}
+            outputs = [node for node in self.nodes if node not in used]
+        return _Run(self, outputs).start()
+
+
+def _fusable(func):
+    # Only plain cpu_bound functions, whose other options would be skipped by running them as one job
+    return isinstance(func, unsync) and func.cpu_bound and set(func.kwargs) <= {'cpu_bound'}
+
+
+class _Task(object):
+    """One or more nodes started together, the last of which is the one whose result is kept"""
+    def __init__(self, nodes):
+        self.nodes = nodes
+        self.tail = nodes[-1]
+        members = set(nodes)
+        self.dependencies = []
+        for node in nodes:
+            for dependency in node.dependencies:
+                if dependency not in members and dependency not in self.dependencies:
+                    self.dependencies.append(dependency)
+        self.waiting = len(self.dependencies)
+
+
+class _Run(object):
+    def __init__(self, graph, outputs):
+        self.lock = threading.Lock()
+        self.requested = list(outputs)
+        self.outputs = {node: concurrent.futures.Future() for node in outputs}
+        needed = set()
+        pending = list(outputs)
+        while pending:
+            node = pending.pop()
+            if node not in needed:
+                needed.add(node)
+                pending.extend(node.dependencies)
+        needed = [node for node in graph.nodes if node in needed]
+        dependents = {node: [] for node in needed}
+        for node in needed:
+            for dependency in node.dependencies:
+                dependents[dependency].append(node)
+        self.tasks = self._plan(needed, dependents)
+        self.task_of = {node: task for task in self.tasks for node in task.nodes}
+        # Tasks started once each of their dependencies completes
+        self.dependents = {task.tail: [self.task_of[node] for node in dependents[task.tail]] for task in self.tasks}
+        # Number of tasks still to start using each result, which is released when it drops to 0
+        self.users = {task.tail: len(self.dependents[task.tail]) for task in self.tasks}
+        self.results = {}
+
+    def _plan(self, needed, dependents):
+        fused_into = {}
+        for node in needed:
+            if len(node.dependencies) == 1:
+                previous = node.dependencies[0]
+                if _fusable(node.func) and _fusable(previous.func) and dependents[previous] == [node] \
+                        and previous not in self.outputs:
+                    fused_into[previous] = node
+        tasks = []
+        heads = [node for node in needed if node not in fused_into.values()]
+        for node in heads:
+            chain = [node]
+            while chain[-1] in fused_into:
+                chain.append(fused_into[chain[-1]])
+            tasks.append(_Task(chain))
+        return tasks
+
+    def start(self):
+        # Taken before starting any, as dependents of tasks completing meanwhile are started by those
+        ready = [task for task in self.tasks if not task.waiting]
+        for task in ready:
+            self._start(task)
+        # One for each requested output, including repeated ones
+        return [Unfuture(self.outputs[node]) for node in self.requested]
+
+    def _resolve(self, value, previous=None):
+        if previous is not None and value is previous:
+            return _PreviousResult()
+        if isinstance(value, Node):
+            return self.results[value]
+        return value
+
+    def _start(self, task):
+        try:
+            with self.lock:
+                steps = []
+                previous = None
+                for node in task.nodes:
+                    args = tuple(self._resolve(value, previous) for value in node.args)
+                    kwargs = {name: self._resolve(value, previous) for name, value in node.kwargs.items()}
+                    steps.append((node, args, kwargs))
+                    previous = node
+                self._release(task.dependencies)
+            if len(steps) == 1:
+                node, args, kwargs = steps[0]
+                result = node.func(*args, **kwargs)
+            else:
+                result = Unfuture(unsync.process_executor.submit(_multiprocess_chain_target, [
+                    ((node.func.func.__module__, node.func.func.__name__), args, kwargs)
+                    for node, args, kwargs in steps]))
+        except Exception as exc:
+            self._failed(task, exc)
+            return
+        if isinstance(result, Unfuture):
+            _on_done(result, lambda future: self._completed(task, future))
+        else:
+            self._finish(task, result)
+
+    def _release(self, dependencies):
+        # Must hold self.lock
+        for dependency in dependencies:
+            self.users[dependency] -= 1
+            if not self.users[dependency] and dependency not in self.outputs:
+                del self.results[dependency]
+
+    def _completed(self, task, future):
+        if future.cancelled():
+            self._failed(task, concurrent.futures.CancelledError())
+        elif future.exception() is not None:
+            self._failed(task, future.exception())
+        else:
+            self._finish(task, future.result())
+
+    def _finish(self, task, result):
+        ready = []
+        with self.lock:
+            if self.users[task.tail]:
+                self.results[task.tail] = result
+            for dependent in self.dependents[task.tail]:
+                dependent.waiting -= 1
+                if not dependent.waiting:
+                    ready.append(dependent)
+        output = self.outputs.get(task.tail)
+        if output is not None:
+            output.set_result(result)
+        for dependent in ready:
+            self._start(dependent)
+
+    def _failed(self, task, exc):
+        # Tasks reached through several paths are only visited once
+        failed, seen = [task], {task}
+        while failed:
+            task = failed.pop()
+            output = self.outputs.get(task.tail)
+            if output is not None and not output.done():
+                output.set_exception(exc)
+            for dependent in self.dependents[task.tail]:
+                if dependent not in seen:
+                    seen.add(dependent)
+                    failed.append(dependent)
+
+
+def _on_done(unfuture, callback):
+    # Concurrent Futures call back from the thread completing them, saving a hop to the loop
+    if unfuture._concurrent_future is not None:
+        unfuture._concurrent_future.add_done_callback(callback)
+    else:
+        unfuture._add_done_callback(callback)
@@ -0,0 +1,44 @@
+import threading
+import time
+
+_PERIODS = {'s': 1.0, 'm': 60.0, 'h': 3600.0}
+
+
+class RateLimit(object):
+    """
+    Token bucket for @unsync(rate_limit=...), allowing `rate` calls per second on average and bursts of up to
+    `burst` calls, one second worth of calls by default. `rate` is a number of calls per second or a string like
+    '100/s', '600/m' or '1000/h'. Share one RateLimit between functions calling the same backend.
+    """
+    def __init__(self, rate, burst=None):
+        self.rate = _parse_rate(rate)
+        self.burst = burst if burst is not None else max(1, int(self.rate))
+        self.lock = threading.Lock()
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+
+    def reserve(self):
+        """Takes a token, returning how many seconds to wait until it may be used"""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            # Tokens go negative as calls are reserved ahead, so waiting calls start in order
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def refund(self):
+        """Returns the token of a call cancelled while waiting"""
+        with self.lock:
+            self.tokens = min(self.burst, self.tokens + 1)
+
+
+def _parse_rate(rate):
+    if isinstance(rate, str):
+        count, _, period = rate.partition('/')
+        if period not in _PERIODS:
+            raise ValueError('Expected a rate like "100/s", "600/m" or "1000/h", got %r' % rate)
+        rate = float(count) / _PERIODS[period]
+    if rate <= 0:
+        raise ValueError('The rate must be positive')
+    return float(rate)
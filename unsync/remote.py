@@ -0,0 +1,403 @@
+"""
+Remote execution of cpu_bound calls.
+Start workers with `python -m unsync.remote --host 0.0.0.0 --port 6000 --workers 8 --authkey secret` on each
+machine, and use `RemoteExecutor(['host-a:6000', 'host-b:6000'], authkey='secret')` as the executor of
+@unsync(cpu_bound=True) functions. Their modules must be importable by the workers.
+"""
+import argparse
+import collections
+import concurrent.futures
+import functools
+import itertools
+import os
+import pickle
+import signal
+import socket
+import sys
+import threading
+from multiprocessing.connection import Client, Listener
+
+from unsync import shared
+from unsync.unsync import _process_initializer, _set_concurrent_state
+
+
+class RemoteWorkerLost(ConnectionError):
+    """Raised for calls in flight on a remote worker whose connection was lost, they may or may not have run"""
+
+
+def _authkey(authkey):
+    authkey = authkey or os.environ.get('UNSYNC_AUTHKEY')
+    if not authkey:
+        raise ValueError('An authkey, or the UNSYNC_AUTHKEY environment variable, is required')
+    return authkey.encode() if isinstance(authkey, str) else authkey
+
+
+def _address(address):
+    if isinstance(address, str):
+        host, _, port = address.rpartition(':')
+        return host or 'localhost', int(port)
+    return tuple(address)
+
+
+class RemoteExecutor(concurrent.futures.Executor):
+    """
+    Executor sending calls to `python -m unsync.remote` workers at `addresses`, each call to the connected worker
+    with the fewest calls in flight for its number of processes. Workers that can't be reached are retried every
+    `reconnect_interval` seconds, and calls are held back while none is connected.
+    Calls in flight on a worker whose connection is lost fail with RemoteWorkerLost.
+    """
+    # Workers can't read this machine's files, so shared_memory arguments are pickled instead
+    supports_shared_memory = False
+
+    def __init__(self, addresses, authkey=None, reconnect_interval=1.0):
+        self.authkey = _authkey(authkey)
+        self.reconnect_interval = reconnect_interval
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._ids = itertools.count()
+        self._backlog = collections.deque()
+        # Every call submitted and not yet completed, waited for by shutdown
+        self._pending = set()
+        self._shutdown = False
+        # Set once the calls in flight at shutdown completed and the connections are closed
+        self._closed = False
+        self._workers = [_RemoteWorker(self, _address(address)) for address in addresses]
+        for worker in self._workers:
+            worker.try_connect()
+        self._thread = threading.Thread(target=self._reconnect, name='unsync-remote', daemon=True)
+        self._thread.start()
+
+    @property
+    def connected(self):
+        """The number of workers currently connected"""
+        return sum(1 for worker in self._workers if worker.conn is not None)
+
+    @property
+    def _max_workers(self):
+        return sum(worker.processes for worker in self._workers if worker.conn is not None) or 1
+
+    def submit(self, fn, *args, **kwargs):
+        future = concurrent.futures.Future()
+        call = (next(self._ids), fn, args, kwargs)
+        with self._lock:
+            if self._shutdown:
+                raise RuntimeError('cannot schedule new futures after shutdown')
+            self._pending.add(future)
+        future.add_done_callback(self._pending.discard)
+        # Running as soon as submitted, cancelling goes through unsync_cancel so calls sent to a worker can be dropped
+        future.set_running_or_notify_cancel()
+        future.unsync_cancel = lambda: self._cancel(future, call[0])
+        self._dispatch(future, call)
+        return future
+
+    def _pick(self):
+        connected = [worker for worker in self._workers if worker.conn is not None]
+        if not connected:
+            return None
+        return min(connected, key=lambda worker: len(worker.in_flight) / worker.processes)
+
+    def _dispatch(self, future, call):
+        while True:
+            with self._lock:
+                worker = self._pick()
+                if worker is None:
+                    self._backlog.append((future, call))
+                    return
+            if worker.send(future, call):
+                return
+
+    def _cancel(self, future, call_id):
+        """Drops the call if it hasn't started on its worker, returning False if it's too late"""
+        if future.done():
+            return False
+        with self._lock:
+            for index, (waiting, _) in enumerate(self._backlog):
+                if waiting is future:
+                    del self._backlog[index]
+                    _set_concurrent_state(future, exception=concurrent.futures.CancelledError())
+                    return True
+        for worker in self._workers:
+            if call_id in worker.in_flight:
+                return worker.cancel(call_id)
+        return False
+
+    def _connected(self):
+        with self._lock:
+            backlog, self._backlog = self._backlog, collections.deque()
+        for future, call in backlog:
+            self._dispatch(future, call)
+
+    def _reconnect(self):
+        while not self._closed:
+            self._wakeup.wait(self.reconnect_interval)
+            self._wakeup.clear()
+            for worker in self._workers:
+                if worker.conn is None and not self._closed:
+                    worker.try_connect()
+
+    def shutdown(self, wait=True, *, cancel_futures=False):
+        """
+        Stops accepting calls, and closes the connections once the calls submitted so far completed,
+        waiting for them if `wait`. Calls not yet sent to a worker are cancelled instead if `cancel_futures`.
+        """
+        with self._lock:
+            self._shutdown = True
+            backlog = ()
+            if cancel_futures:
+                backlog, self._backlog = self._backlog, collections.deque()
+            pending = list(self._pending)
+        for future, _ in backlog:
+            _set_concurrent_state(future, exception=concurrent.futures.CancelledError())
+        if wait:
+            self._close(pending)
+        else:
+            threading.Thread(target=self._close, args=(pending,), name='unsync-remote-shutdown', daemon=True).start()
+
+    def _close(self, pending):
+        # Workers are still reconnected meanwhile, so the backlog can be sent
+        concurrent.futures.wait(pending)
+        self._closed = True
+        self._wakeup.set()
+        for worker in self._workers:
+            worker.close()
+
+
+class _RemoteWorker(object):
+    def __init__(self, executor, address):
+        self.executor = executor
+        self.address = address
+        self.conn = None
+        self.processes = 1
+        self.send_lock = threading.Lock()
+        self.in_flight = {}
+
+    def try_connect(self):
+        try:
+            conn = Client(self.address, authkey=self.executor.authkey)
+            _, self.processes = conn.recv()
+        except (OSError, EOFError):
+            return False
+        self.conn = conn
+        threading.Thread(target=self._receive, args=(conn,), name='unsync-remote-%s:%d' % self.address,
+                         daemon=True).start()
+        self.executor._connected()
+        return True
+
+    def send(self, future, call):
+        """Sends the call, returning False if this worker was disconnected so it should be sent to another"""
+        conn = self.conn
+        if conn is None:
+            return False
+        call_id = call[0]
+        self.in_flight[call_id] = future
+        try:
+            with self.send_lock:
+                conn.send(('call',) + call)
+        except OSError:
+            self.in_flight.pop(call_id, None)
+            _shutdown(conn)
+            return False
+        except Exception as exc:
+            # Unpicklable arguments
+            self.in_flight.pop(call_id, None)
+            _set_concurrent_state(future, exception=exc)
+        return True
+
+    def cancel(self, call_id):
+        # The worker replies 'cancelled' if the call hadn't started, and with its result otherwise
+        conn = self.conn
+        if conn is None:
+            return False
+        try:
+            with self.send_lock:
+                conn.send(('cancel', call_id))
+        except OSError:
+            return False
+        return True
+
+    def _receive(self, conn):
+        try:
+            while True:
+                message = conn.recv()
+                future = self.in_flight.pop(message[1], None)
+                if future is None:
+                    continue
+                if message[0] == 'cancelled':
+                    _set_concurrent_state(future, exception=concurrent.futures.CancelledError())
+                elif message[2]:
+                    _set_concurrent_state(future, message[3])
+                else:
+                    _set_concurrent_state(future, exception=message[3])
+        except (OSError, EOFError):
+            pass
+        self._disconnected(conn)
+
+    def _disconnected(self, conn):
+        if self.conn is conn:
+            self.conn = None
+        with self.send_lock:
+            conn.close()
+        in_flight, self.in_flight = self.in_flight, {}
+        for future in in_flight.values():
+            _set_concurrent_state(
+                future, exception=RemoteWorkerLost('Lost the connection to remote worker %s:%d' % self.address))
+        self.executor._wakeup.set()
+
+    def close(self):
+        conn = self.conn
+        if conn is not None:
+            _shutdown(conn)
+
+
+def _shutdown(conn):
+    # Wakes the thread receiving from the connection, which is the only one closing it
+    try:
+        with socket.fromfd(conn.fileno(), socket.AF_INET, socket.SOCK_STREAM) as sock:
+            sock.shutdown(socket.SHUT_RDWR)
+    except OSError:
+        pass
+
+
+class _Client(object):
+    """A RemoteExecutor connected to the server"""
+    def __init__(self, conn):
+        self.conn = conn
+        self.lock = threading.Lock()
+
+    def reply(self, message):
+        try:
+            with self.lock:
+                try:
+                    self.conn.send(message)
+                except (pickle.PicklingError, TypeError, AttributeError) as exc:
+                    self.conn.send(('result', message[1], False, pickle.PicklingError(str(exc))))
+        except OSError:
+            pass
+
+
+class _Server(object):
+    """
+    Runs the calls received from every RemoteExecutor connected to it in a process pool, in the order received.
+    Calls wait here rather than in the pool until a process is free, so they can still be cancelled.
+    """
+    def __init__(self, address, authkey, workers=None, preload=()):
+        self.listener = Listener(address, authkey=authkey)
+        self.pool = concurrent.futures.ProcessPoolExecutor(
+            workers, initializer=_process_initializer, initargs=(tuple(preload), shared.disable, ()))
+        self.workers = self.pool._max_workers
+        self.lock = threading.Lock()
+        self.queue = collections.deque()
+        self.running = 0
+        self.clients = set()
+        self.closed = False
+
+    def serve(self):
+        while not self.closed:
+            try:
+                conn = self.listener.accept()
+            except (OSError, EOFError, pickle.UnpicklingError):
+                # Failed authentication or handshake
+                continue
+            threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+
+    def _handle(self, conn):
+        client = _Client(conn)
+        self.clients.add(client)
+        try:
+            conn.send(('hello', self.workers))
+            while True:
+                message = conn.recv()
+                if message[0] == 'cancel':
+                    self._cancel(client, message[1])
+                else:
+                    with self.lock:
+                        self.queue.append((client, message[1:]))
+                    self._fill()
+        except (OSError, EOFError):
+            # The client went away, drop the calls it was waiting for
+            with self.lock:
+                self.queue = collections.deque(entry for entry in self.queue if entry[0] is not client)
+        self.clients.discard(client)
+        with client.lock:
+            conn.close()
+
+    def _cancel(self, client, call_id):
+        with self.lock:
+            for index, (queued, call) in enumerate(self.queue):
+                if queued is client and call[0] == call_id:
+                    del self.queue[index]
+                    break
+            else:
+                # Already running, its result is sent as usual
+                return
+        client.reply(('cancelled', call_id))
+
+    def _fill(self):
+        while True:
+            with self.lock:
+                if not self.queue or self.running >= self.workers:
+                    return
+                client, (call_id, fn, args, kwargs) = self.queue.popleft()
+                self.running += 1
+            try:
+                future = self.pool.submit(fn, *args, **kwargs)
+            except Exception as exc:
+                # A broken pool, the worker must be restarted
+                future = concurrent.futures.Future()
+                future.set_exception(exc)
+            future.add_done_callback(functools.partial(self._done, client, call_id))
+
+    def _done(self, client, call_id, future):
+        with self.lock:
+            self.running -= 1
+        self._fill()
+        if future.exception() is not None:
+            client.reply(('result', call_id, False, future.exception()))
+        else:
+            client.reply(('result', call_id, True, future.result()))
+
+    def close(self):
+        self.closed = True
+        # Clients see the calls in flight fail right away, rather than once they complete
+        self.listener.close()
+        for client in list(self.clients):
+            _shutdown(client.conn)
+        with self.lock:
+            self.queue.clear()
+        # Only running calls are submitted to the pool, so it has no queued calls to cancel. Stopping its processes
+        # first lets shutdown return right away without cancel_futures, which needs Python 3.9
+        for process in list((self.pool._processes or {}).values()):
+            process.terminate()
+        self.pool.shutdown()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Runs cpu_bound calls sent by unsync.remote.RemoteExecutor')
+    parser.add_argument('--host', default='127.0.0.1',
+                        help='address to listen on, only this machine by default. Pass 0.0.0.0 to accept calls '
+                             'from other machines, which run whatever code they send')
+    parser.add_argument('--port', type=int, default=6000, help='0 picks a free port')
+    parser.add_argument('--workers', type=int, help='number of worker processes, the number of CPUs by default')
+    parser.add_argument('--authkey', help='shared secret, defaults to the UNSYNC_AUTHKEY environment variable')
+    parser.add_argument('--preload', action='append', default=[], help='module imported by each worker process')
+    args = parser.parse_args(argv)
+
+    server = _Server((args.host, args.port), _authkey(args.authkey), args.workers, args.preload)
+    # Exit through SystemExit so the process pool is shut down too
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    host, port = server.listener.address
+    print('unsync.remote listening on %s:%d with %d workers' % (host, port, server.workers), flush=True)
+    thread = threading.Thread(target=server.serve, name='unsync-remote-server', daemon=True)
+    thread.start()
+    try:
+        # Signals delivered to another thread don't interrupt a blocking accept(), so the main thread only waits
+        while thread.is_alive():
+            thread.join(0.1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+import asyncio
+import bisect
+import collections
+import concurrent.futures
+import random
+import threading
+
+
+class Retry(object):
+    """
+    Retry policy for @unsync(retry=Retry(...)), or @unsync(retry=N) for the defaults.
+    Calls failing with one of `exceptions` are retried up to `retries` times, after a delay drawn uniformly
+    between 0 and `backoff` * 2 ** retry seconds, capped at `max_backoff` (full jitter).
+    """
+    def __init__(self, retries=3, backoff=0.1, max_backoff=10.0, exceptions=(Exception,)):
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.exceptions = exceptions
+
+    def should_retry(self, exc, retry):
+        return retry < self.retries and isinstance(exc, self.exceptions)
+
+    def delay(self, retry):
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** retry))
+
+
+class Hedge(object):
+    """
+    Hedging policy for @unsync(hedge_after_ms=...): a duplicate call is started once the first has run for
+    `after` milliseconds, or for the given percentile of recent latencies with a string like 'p95'.
+    Percentiles are only used once `min_samples` calls completed.
+    """
+    def __init__(self, after, window=1000, min_samples=20):
+        self.percentile = None
+        self.after = None
+        if isinstance(after, str):
+            if not after.startswith('p'):
+                raise ValueError('Expected a number of milliseconds or a percentile like "p95", got %r' % after)
+            self.percentile = float(after[1:]) / 100
+        else:
+            self.after = after / 1000
+        self.min_samples = min_samples
+        self.lock = threading.Lock()
+        self.recent = collections.deque(maxlen=window)
+        self.ordered = []
+
+    def delay(self):
+        """Seconds after which to start a duplicate call, or None while too few latencies are known"""
+        if self.percentile is None:
+            return self.after
+        with self.lock:
+            if len(self.ordered) < self.min_samples:
+                return None
+            return self.ordered[min(len(self.ordered) - 1, int(len(self.ordered) * self.percentile))]
+
+    def record(self, latency):
+        if self.percentile is None:
+            return
+        with self.lock:
+            if len(self.recent) == self.recent.maxlen:
+                oldest = self.recent[0]
+                del self.ordered[bisect.bisect_left(self.ordered, oldest)]
+            self.recent.append(latency)
+            bisect.insort(self.ordered, latency)
+
+
+async def resilient_call(attempt, retry=None, hedge=None):
+    """
+    Awaits Unfutures returned by `attempt()`, retrying failures and hedging slow attempts as configured.
+    Backoff delays are timers on the running loop, so no worker waits through them.
+    """
+    retries = 0
+    while True:
+        try:
+            if hedge is None:
+                return await attempt()
+            return await _hedged(attempt, hedge)
+        except (asyncio.CancelledError, concurrent.futures.CancelledError):
+            # An Exception before Python 3.8, cancelled calls are never retried
+            raise
+        except Exception as exc:
+            if retry is None or not retry.should_retry(exc, retries):
+                raise
+            await asyncio.sleep(retry.delay(retries))
+            retries += 1
+
+
+async def _hedged(attempt, hedge):
+    loop = asyncio.get_event_loop()
+    start = loop.time()
+    first = attempt()
+    attempts = {first.future: first}
+    try:
+        delay = hedge.delay()
+        if delay is not None:
+            done, _ = await asyncio.wait(list(attempts), timeout=delay)
+            if not done:
+                second = attempt()
+                attempts[second.future] = second
+        error = None
+        pending = set(attempts)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for future in done:
+                if future.cancelled() or isinstance(future.exception(), concurrent.futures.CancelledError):
+                    # Not a failure the other attempt may recover from
+                    raise asyncio.CancelledError()
+                if future.exception() is None:
+                    hedge.record(loop.time() - start)
+                    return future.result()
+                if error is None:
+                    error = future.exception()
+        raise error
+    finally:
+        # Cancels the slower attempt, or every attempt if this call was cancelled
+        for unfuture in attempts.values():
+            unfuture.cancel()
@@ -0,0 +1,176 @@
+"""
+Zero-copy passing of large buffers to and from cpu_bound functions through memory mapped files.
+Buffers are written to a file (in /dev/shm where available, so it is backed by shared memory) and only a small handle
+is pickled through the process pool. Workers map the file instead of unpickling a copy.
+"""
+import itertools
+import mmap
+import os
+import threading
+
+DEFAULT_THRESHOLD = 1 << 20
+# Cleared in the workers of remote servers, whose files the caller can't read
+_enabled = True
+
+
+def _shared_dir():
+    if os.path.isdir('/dev/shm') and os.access('/dev/shm', os.W_OK):
+        return '/dev/shm'
+    return None
+
+
+def _buffer_kind(value):
+    if isinstance(value, bytes):
+        return 'bytes', len(value), None
+    if isinstance(value, bytearray):
+        return 'bytearray', len(value), None
+    if isinstance(value, memoryview):
+        return 'memoryview', value.nbytes, (value.format, value.shape)
+    # NumPy is optional, recognize its arrays without importing it
+    if type(value).__name__ == 'ndarray' and type(value).__module__ == 'numpy':
+        return 'ndarray', value.nbytes, (value.dtype.str, value.shape)
+    return None, 0, None
+
+
+def _write(value, kind):
+    import tempfile
+    if kind == 'ndarray':
+        import numpy
+        data = numpy.ascontiguousarray(value).data.cast('B')
+    elif kind == 'memoryview':
+        data = value.cast('B') if value.c_contiguous else value.tobytes()
+    else:
+        data = value
+    fd, path = tempfile.mkstemp(prefix='unsync-', dir=_shared_dir())
+    with os.fdopen(fd, 'wb') as file:
+        file.write(data)
+    return path
+
+
+def _unlink(path):
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
+
+
+def _attach(path, size, kind, meta):
+    # Copy on write, so the worker may modify its arguments without affecting other calls sharing the file
+    with open(path, 'rb') as file:
+        buffer = mmap.mmap(file.fileno(), size, access=mmap.ACCESS_COPY)
+    if kind == 'bytes':
+        value = buffer[:]
+        buffer.close()
+    elif kind == 'bytearray':
+        value = bytearray(buffer)
+        buffer.close()
+    elif kind == 'memoryview':
+        value = memoryview(buffer).cast(meta[0], meta[1])
+    else:
+        import numpy
+        value = numpy.frombuffer(buffer, dtype=meta[0]).reshape(meta[1])
+    return value
+
+
+def _receive(path, size, kind, meta):
+    try:
+        with open(path, 'rb') as file:
+            if kind == 'ndarray':
+                import numpy
+                value = numpy.empty(meta[1], dtype=meta[0])
+                file.readinto(value.data.cast('B'))
+            else:
+                value = bytearray(size)
+                file.readinto(value)
+    finally:
+        _unlink(path)
+    if kind == 'bytes':
+        return bytes(value)
+    if kind == 'memoryview':
+        return memoryview(value).cast(meta[0], meta[1])
+    return value
+
+
+class SharedArgument(object):
+    """A large argument written to a mapped file, it is unpickled in the worker by mapping that file"""
+    def __init__(self, path, size, kind, meta):
+        self.handle = (path, size, kind, meta)
+
+    def __reduce__(self):
+        return _attach, self.handle
+
+
+class SharedResult(object):
+    """A large result written to a mapped file by a worker, it is unpickled by reading and removing that file"""
+    def __init__(self, value, kind, size, meta):
+        self.handle = (_write(value, kind), size, kind, meta)
+
+    def __reduce__(self):
+        return _receive, self.handle
+
+
+class SharedArguments(object):
+    """
+    Reference counts the files of arguments in flight, so a bytes object passed to many concurrent calls is only
+    written once and its file is removed when the last of those calls completes. Mutable buffers may change between
+    calls, so they are written for each call.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.files = {}
+        self.ids = itertools.count()
+
+    def share(self, args, kwargs, threshold):
+        shared = []
+
+        def convert(value):
+            kind, size, meta = _buffer_kind(value)
+            if kind is None or size < threshold:
+                return value
+            if kind != 'bytes':
+                key = ('mutable', next(self.ids))
+                entry = [SharedArgument(_write(value, kind), size, kind, meta), 1, None]
+                with self.lock:
+                    self.files[key] = entry
+                shared.append(key)
+                return entry[0]
+            with self.lock:
+                entry = self.files.get(id(value))
+                if entry is None:
+                    # The value is kept alive by the entry so its id can't be reused while the file exists
+                    entry = self.files[id(value)] = [SharedArgument(_write(value, kind), size, kind, meta), 0, value]
+                entry[1] += 1
+            shared.append(id(value))
+            return entry[0]
+
+        args = tuple(convert(arg) for arg in args)
+        kwargs = {key: convert(value) for key, value in kwargs.items()}
+        return args, kwargs, shared
+
+    def release(self, shared):
+        for key in shared:
+            with self.lock:
+                entry = self.files[key]
+                entry[1] -= 1
+                if not entry[1]:
+                    _unlink(entry[0].handle[0])
+                    del self.files[key]
+
+
+def disable():
+    """Makes the functions wrapped by share_result in this process return their results as they are"""
+    global _enabled
+    _enabled = False
+
+
+def share_result(func, threshold):
+    """Wraps `func` to return large buffers as SharedResults, for use in worker processes"""
+    def wrapper(*args, **kwargs):
+        result = func(*args, **kwargs)
+        kind, size, meta = _buffer_kind(result)
+        if _enabled and kind is not None and size >= threshold:
+            return SharedResult(result, kind, size, meta)
+        return result
+
+    wrapper.__wrapped__ = func
+    return wrapper
@@ -0,0 +1,120 @@
+import collections
+import threading
+import time
+
+CallRecord = collections.namedtuple('CallRecord', ['function', 'queue_wait', 'run_time', 'latency', 'exception'])
+CallRecord.__doc__ = """
+Timings of a completed @unsync call, in seconds, as passed to the hooks added with unsync.add_hook.
+queue_wait is the time from the call until the loop or executor started the work, and is None along with
+run_time if the call was cancelled before it started.
+"""
+
+
+class _Call(object):
+    __slots__ = ('function', 'stats', 'submitted', 'started', 'finished', 'run_time')
+
+    def __init__(self, function, stats=None):
+        self.function = function
+        self.stats = stats
+        self.submitted = time.perf_counter()
+        self.started = None
+        self.finished = None
+        self.run_time = None
+
+    def record(self, future):
+        finished = self.finished or time.perf_counter()
+        latency = finished - self.submitted
+        run_time = self.run_time
+        if run_time is None and self.started is not None:
+            run_time = finished - self.started
+        queue_wait = None if run_time is None else latency - run_time
+        exception = None if future.cancelled() else future.exception()
+        return CallRecord(self.function, queue_wait, run_time, latency, exception)
+
+
+class _Timing(object):
+    __slots__ = ('count', 'total', 'max')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, value):
+        if value is None:
+            return
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def snapshot(self):
+        return {'mean': self.total / self.count if self.count else None, 'max': self.max}
+
+
+class FunctionStats(object):
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.in_flight = 0
+        self.failed = 0
+        self.queue_wait = _Timing()
+        self.run_time = _Timing()
+        self.latency = _Timing()
+
+    def submitted(self):
+        with self.lock:
+            self.calls += 1
+            self.in_flight += 1
+
+    def completed(self, record):
+        with self.lock:
+            self.in_flight -= 1
+            if record.exception is not None:
+                self.failed += 1
+            self.queue_wait.add(record.queue_wait)
+            self.run_time.add(record.run_time)
+            self.latency.add(record.latency)
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'calls': self.calls,
+                'in_flight': self.in_flight,
+                'failed': self.failed,
+                'queue_wait': self.queue_wait.snapshot(),
+                'run_time': self.run_time.snapshot(),
+                'latency': self.latency.snapshot(),
+            }
+
+
+class LoopLagProbe(object):
+    """
+    Measures how late a timer scheduled every `interval` seconds fires on `loop`,
+    which is how long ready callbacks are waiting behind each other.
+    """
+    def __init__(self, loop, interval=0.1):
+        self.loop = loop
+        self.interval = interval
+        self.lag = 0.0
+        self.max_lag = 0.0
+        self.running = False
+
+    def start(self):
+        self.running = True
+        self.loop.call_soon_threadsafe(self._schedule)
+
+    def stop(self):
+        self.running = False
+
+    def _schedule(self):
+        if self.running:
+            expected = self.loop.time() + self.interval
+            self.loop.call_at(expected, self._probe, expected)
+
+    def _probe(self, expected):
+        self.lag = max(0.0, self.loop.time() - expected)
+        self.max_lag = max(self.max_lag, self.lag)
+        self._schedule()
+
+    def snapshot(self):
+        return {'lag': self.lag, 'max': self.max_lag}
@@ -1,17 +1,201 @@
-import asyncio
-import concurrent
+import collections
 import functools
-import inspect
+import heapq
+import itertools
+import os
+import queue
+import signal
+import sys
 import threading
+import time
+import weakref
 from threading import Thread
 from typing import Generic, TypeVar
 
+from unsync.ratelimit import RateLimit
+from unsync.shared import DEFAULT_THRESHOLD, SharedArguments, share_result
+from unsync.stats import FunctionStats, LoopLagProbe, _Call
+
+
+class _LazyModule(object):
+    """
+    Stands for a module in the globals of this one until an attribute of it is first read, then imports it and
+    replaces itself, so that importing unsync and decorating functions doesn't import asyncio.
+    """
+    def __init__(self, name, submodule=None):
+        self.name = name
+        self.submodule = submodule or name
+
+    def __getattr__(self, attribute):
+        __import__(self.submodule)
+        module = globals()[self.name] = sys.modules[self.name]
+        return getattr(module, attribute)
+
+
+asyncio = _LazyModule('asyncio')
+concurrent = _LazyModule('concurrent', 'concurrent.futures')
+inspect = _LazyModule('inspect')
+pickle = _LazyModule('pickle')
+
+
 class unsync_meta(type):
+    _loop_count = 1
+    _placement = 'round_robin'
+    _round_robin = itertools.count()
+    _executors = {}
+    _processes = None
+    _preload = ()
+    _process_initializer = None
+    _process_initargs = ()
+    _max_tasks_per_child = None
+    # Instrumentation is only done while stats are enabled or hooks are added
+    _instrumented = False
+    _stats_enabled = False
+    _hooks = []
+    _function_stats = {}
+    _lag_probes = []
+    # Set once a call with a priority may be submitted to an executor, see _dispatcher
+    _prioritized = False
+    # Names of executors, and ('default', attribute) keys of the default ones, that may receive calls with a priority
+    _prioritized_executors = frozenset()
+    _parallel_mode = None
+    _caller_loop = False
+    _loop_factory = None
+    _loop_settings = {}
+    _starvation_limit = 1.0
+    _dispatchers = weakref.WeakKeyDictionary()
 
     def _init_loop(cls):
-        cls._loop = asyncio.new_event_loop()
-        cls._thread = Thread(target=cls._thread_target, args=(cls._loop,), daemon=True)
-        cls._thread.start()
+        cls._loops = []
+        cls._loop_threads = []
+        unsync_meta._start_loops(cls, cls._loop_count)
+        cls._loop, cls._thread = cls._loops[0], cls._loop_threads[0]
+
+    def _start_loops(cls, count):
+        while len(cls._loops) < count:
+            loop = (cls._loop_factory or asyncio.new_event_loop)()
+            _tune_loop(loop, **cls._loop_settings)
+            thread = Thread(target=cls._thread_target, args=(loop,), daemon=True)
+            thread.start()
+            cls._loops.append(loop)
+            cls._loop_threads.append(thread)
+            if cls._stats_enabled:
+                unsync_meta._probe_loop(cls, loop)
+
+    def configure(cls, loops=None, placement=None, executors=None, stats=None, processes=None, preload=None,
+                  process_initializer=None, process_initargs=(), max_tasks_per_child=None, thread_executor=None,
+                  starvation_limit=None, caller_loop=None, loop_factory=None, slow_callback_duration=None,
+                  debug=None, loop_executor_workers=None):
+        """
+        Configures the unsync event loops.
+        `loops` sets the number of loop threads @unsync functions are spread across, surplus loops are stopped
+        without finishing their pending work so the count should only be reduced while they are idle.
+        `placement` sets the default policy for choosing a loop, see unsync.place.
+        `executors` adds named executors for @unsync(executor=name), each either an Executor
+        or the number of workers of a ThreadPoolExecutor created on first use.
+        `stats` enables collecting the per-function statistics and loop lag returned by unsync.stats.
+        `processes`, `preload`, `process_initializer`, `process_initargs` and `max_tasks_per_child` configure
+        unsync.process_executor: its number of workers, modules imported by each worker as it starts, an initializer
+        called after them, and how many tasks a worker runs before it is replaced, which requires Python 3.11.
+        The process executor is replaced if it was already created.
+        `thread_executor` replaces unsync.thread_executor, which runs regular @unsync functions, with an Executor,
+        or with an AdaptiveThreadPoolExecutor sizing itself to the load if 'adaptive'.
+        `starvation_limit` is how many seconds a queued call may be passed over by calls of higher priority.
+        `caller_loop` runs async @unsync functions called from a coroutine on the caller's event loop.
+        `loop_factory` is called to create the unsync loops instead of the event loop policy, for example
+        uvloop.new_event_loop, and may only be set before they are started by the first @unsync call.
+        `slow_callback_duration`, `debug` and `loop_executor_workers`, the size of the default executor used by
+        loop.run_in_executor, tune the unsync loops, including those already running.
+        """
+        unsync_meta._configure_processes(cls, processes, preload, process_initializer, process_initargs,
+                                         max_tasks_per_child)
+        if stats is not None:
+            unsync_meta._configure_stats(cls, stats)
+        if starvation_limit is not None:
+            cls._starvation_limit = starvation_limit
+        unsync_meta._configure_loop_settings(cls, loop_factory, slow_callback_duration, debug, loop_executor_workers)
+        if thread_executor is not None:
+            unsync_meta._configure_thread_executor(cls, thread_executor)
+        if executors is not None:
+            cls._executors.update(executors)
+        unsync_meta._configure_placement(cls, placement, caller_loop)
+        if loops is not None:
+            unsync_meta._configure_loop_count(cls, loops)
+
+    def _configure_processes(cls, processes, preload, process_initializer, process_initargs, max_tasks_per_child):
+        # Replaces the process executor if it was already created, so its new workers use the options
+        if max_tasks_per_child is not None and sys.version_info < (3, 11):
+            raise ValueError('max_tasks_per_child requires Python 3.11 or later')
+        process_options = (processes, preload, process_initializer, max_tasks_per_child)
+        if all(option is None for option in process_options):
+            return
+        if processes is not None:
+            cls._processes = processes
+        if preload is not None:
+            cls._preload = tuple(preload)
+        if process_initializer is not None:
+            cls._process_initializer, cls._process_initargs = process_initializer, tuple(process_initargs)
+        if max_tasks_per_child is not None:
+            cls._max_tasks_per_child = max_tasks_per_child
+        if getattr(cls, '_process_executor', None) is not None:
+            cls._process_executor.shutdown(wait=False)
+            cls._process_executor = None
+
+    def _configure_stats(cls, stats):
+        # Lag probes are restarted, so each of the running loops has one while stats are enabled
+        cls._stats_enabled = stats
+        for probe in cls._lag_probes:
+            probe.stop()
+        cls._lag_probes = []
+        if stats and getattr(cls, '_loops', None) is not None:
+            for loop in cls._loops:
+                unsync_meta._probe_loop(cls, loop)
+        unsync_meta._update_instrumented(cls)
+
+    def _configure_loop_settings(cls, loop_factory, slow_callback_duration, debug, loop_executor_workers):
+        # Settings are applied to the loops already running, and kept for those started later
+        if loop_factory is not None:
+            if getattr(cls, '_loops', None) is not None:
+                raise RuntimeError('The loop factory must be configured before the unsync loops are started')
+            cls._loop_factory = loop_factory
+        settings = {'slow_callback_duration': slow_callback_duration, 'debug': debug}
+        if loop_executor_workers is not None:
+            settings['executor'] = concurrent.futures.ThreadPoolExecutor(
+                loop_executor_workers, thread_name_prefix='unsync-loop-executor')
+        settings = {name: value for name, value in settings.items() if value is not None}
+        if not settings:
+            return
+        cls._loop_settings = dict(cls._loop_settings, **settings)
+        for loop in getattr(cls, '_loops', None) or []:
+            loop.call_soon_threadsafe(functools.partial(_tune_loop, loop, **settings))
+
+    def _configure_placement(cls, placement, caller_loop):
+        if caller_loop is not None:
+            cls._caller_loop = caller_loop
+        if placement is not None:
+            if placement not in _PLACEMENTS:
+                raise ValueError('Unknown placement policy %r' % placement)
+            cls._placement = placement
+
+    def _configure_thread_executor(cls, thread_executor):
+        if thread_executor == 'adaptive':
+            from unsync.executor import AdaptiveThreadPoolExecutor
+            thread_executor = AdaptiveThreadPoolExecutor()
+        previous, cls.thread_executor = getattr(cls, '_thread_executor', None), thread_executor
+        if previous is not None and previous is not thread_executor:
+            previous.shutdown(wait=False)
+
+    def _configure_loop_count(cls, loops):
+        # Surplus loops are stopped without finishing their pending work
+        if loops < 1:
+            raise ValueError('At least one loop is required')
+        cls._loop_count = loops
+        if getattr(cls, '_loops', None) is not None:
+            unsync_meta._start_loops(cls, loops)
+            for loop in cls._loops[loops:]:
+                loop.call_soon_threadsafe(loop.stop)
+            cls._lag_probes = [probe for probe in cls._lag_probes if probe.loop in cls._loops[:loops]]
+            del cls._loops[loops:], cls._loop_threads[loops:]
 
     @property
     def loop(cls):
@@ -25,17 +209,247 @@ class unsync_meta(type):
             unsync_meta._init_loop(cls)
         return cls._thread
 
+    @property
+    def loops(cls):
+        if getattr(cls, '_loops', None) is None:
+            unsync_meta._init_loop(cls)
+        return cls._loops
+
+    def place(cls, placement=None, key=None):
+        """
+        Chooses the loop new work is bound to.
+        'round_robin' cycles through unsync.loops, 'hash' picks a loop by the hash of `key`,
+        and 'sticky' stays on the calling unsync loop, or falls back to round robin outside of one.
+        """
+        loops = cls.loops
+        if len(loops) == 1:
+            return loops[0]
+        placement = placement or cls._placement
+        if placement == 'sticky':
+            running = asyncio._get_running_loop()
+            if running is not None and running in loops:
+                return running
+        elif placement == 'hash':
+            return loops[hash(key) % len(loops)]
+        return loops[next(cls._round_robin) % len(loops)]
+
+    def _in_loop_thread(cls):
+        return threading.current_thread() in getattr(cls, '_loop_threads', ())
+
+    def _probe_loop(cls, loop):
+        probe = LoopLagProbe(loop)
+        probe.start()
+        cls._lag_probes.append(probe)
+
+    def _update_instrumented(cls):
+        cls._instrumented = cls._stats_enabled or bool(cls._hooks)
+
+    def add_hook(cls, hook):
+        """
+        Adds a hook called with a CallRecord on the owning loop as each @unsync call completes,
+        e.g. to export metrics.
+        """
+        cls._hooks = cls._hooks + [hook]
+        unsync_meta._update_instrumented(cls)
+
+    def remove_hook(cls, hook):
+        cls._hooks = [other for other in cls._hooks if other is not hook]
+        unsync_meta._update_instrumented(cls)
+
+    def stats(cls):
+        """
+        Returns a snapshot of the statistics collected since unsync.configure(stats=True), of the form
+        {'functions': {name: {'calls', 'in_flight', 'failed', 'queue_wait', 'run_time', 'latency'}}, 'loop_lag': [...],
+         'thread_executor': {'size', 'idle', 'queue_depth', 'queue_wait', 'completed'}}
+        with timings in seconds, a loop lag for each of unsync.loops, and the state of an adaptive thread_executor.
+        """
+        thread_executor = getattr(cls, '_thread_executor', None)
+        return {
+            'functions': {name: stats.snapshot() for name, stats in list(cls._function_stats.items())},
+            'loop_lag': [probe.snapshot() for probe in cls._lag_probes],
+            'thread_executor': thread_executor.snapshot() if hasattr(thread_executor, 'snapshot') else None,
+        }
+
+    def _manager(cls):
+        if getattr(cls, '_manager_instance', None) is None:
+            import multiprocessing
+            cls._manager_instance = multiprocessing.Manager()
+        return cls._manager_instance
+
+    def _dispatcher(cls, executor, priority=None):
+        """
+        Once calls with a priority may be submitted to an executor with a known number of workers, because a function
+        using it was declared with a priority, options(priority=...) was used, or such a call was made, every call to
+        that executor is held back in a _Limiter while all of its workers are busy, so that they are submitted by
+        priority rather than in order. Other executors are used directly.
+        """
+        if not cls._prioritized and priority is None:
+            return None
+        dispatcher = cls._dispatchers.get(executor)
+        if dispatcher is None and (priority is not None or unsync_meta._is_prioritized(cls, executor)):
+            dispatcher = unsync_meta._add_dispatcher(cls, executor)
+        return dispatcher
+
+    def _add_dispatcher(cls, executor):
+        workers = getattr(executor, '_max_workers', None) or getattr(executor, 'max_workers', None)
+        if not workers:
+            return None
+        created = _Limiter(workers)
+        dispatcher = cls._dispatchers.setdefault(executor, created)
+        if dispatcher is created:
+            # Work may already be queued in or running on the executor
+            created.reserve(executor)
+        cls._prioritized = True
+        return dispatcher
+
+    def _prioritize(cls, executor):
+        """
+        Registers `executor`, an Executor, the name of one or a ('default', attribute) key, as receiving calls with
+        a priority. Executors that aren't created yet get their dispatcher with their first call.
+        """
+        if isinstance(executor, (str, tuple)):
+            cls._prioritized_executors = cls._prioritized_executors | {executor}
+            cls._prioritized = True
+        elif executor not in cls._dispatchers:
+            unsync_meta._add_dispatcher(cls, executor)
+
+    def _is_prioritized(cls, executor):
+        for key in cls._prioritized_executors:
+            if isinstance(key, str):
+                if cls._executors.get(key) is executor:
+                    return True
+            elif getattr(cls, key[1], None) is executor:
+                return True
+            elif key[1] == '_parallel_executor' and cls.parallel_mode == 'processes' \
+                    and getattr(cls, '_process_executor', None) is executor:
+                return True
+        return False
+
+    def _submitted(cls, function):
+        stats = None
+        if cls._stats_enabled:
+            stats = cls._function_stats.get(function)
+            if stats is None:
+                stats = cls._function_stats.setdefault(function, FunctionStats())
+            stats.submitted()
+        return _Call(function, stats)
+
+    def _completed(cls, call, future):
+        record = call.record(future)
+        if call.stats is not None:
+            call.stats.completed(record)
+        for hook in cls._hooks:
+            hook(record)
+
+    def as_completed(cls, unfutures, window=None):
+        """
+        Iterates over Unfutures as they complete, with a blocking for or an async for.
+        `unfutures` is read lazily, so a generator making the calls keeps at most `window` of them in flight.
+        """
+        return _AsCompleted(unfutures, window)
+
+    def map(cls, func, iterable, window=64, ordered=False):
+        """
+        Calls `func` with each item of `iterable` and iterates over the results, with a blocking for or an async for.
+        At most `window` calls are in flight at once and results are yielded as they complete,
+        or in the order of `iterable` if `ordered`. The exception of a failed call is raised when it is reached.
+        """
+        if not isinstance(func, unsync):
+            func = unsync(func)
+        return _AsCompleted((func(item) for item in iterable), window, ordered, results=True)
+
+    def executor(cls, name):
+        executor = cls._executors[name]
+        if isinstance(executor, int):
+            executor = cls._executors[name] = concurrent.futures.ThreadPoolExecutor(executor, name)
+        return executor
+
+    @property
+    def thread_executor(cls):
+        """Runs regular @unsync functions, created on first use"""
+        if getattr(cls, '_thread_executor', None) is None:
+            cls._thread_executor = concurrent.futures.ThreadPoolExecutor()
+        return cls._thread_executor
+
+    @thread_executor.setter
+    def thread_executor(cls, executor):
+        cls._thread_executor = executor
+
     @property
     def process_executor(cls):
         if getattr(cls, '_process_executor', None) is None:
-            cls._process_executor = concurrent.futures.ProcessPoolExecutor()
+            options = {}
+            if cls._max_tasks_per_child is not None:
+                # Only accepted by configure from Python 3.11
+                options['max_tasks_per_child'] = cls._max_tasks_per_child
+            if _jobs.table is None:
+                _jobs.table = _JobTable()
+            cls._process_executor = concurrent.futures.ProcessPoolExecutor(
+                cls._processes, initializer=_process_initializer,
+                initargs=(cls._preload, cls._process_initializer, cls._process_initargs, _jobs.table), **options)
         return cls._process_executor
 
+    def _replace_process_executor(cls, executor):
+        # Called after killing a worker of `executor`, which breaks it
+        if getattr(cls, '_process_executor', None) is executor:
+            cls._process_executor = None
+            executor.shutdown(wait=False)
+
+    def cancelled(cls):
+        """
+        Returns True if the cancellation of the cpu_bound call running in this worker process was requested,
+        so long running functions can check it to stop early.
+        """
+        return _jobs.cancel_requested()
+
+    @property
+    def parallel_mode(cls):
+        """
+        How @unsync(parallel='interpreters') functions run: 'threads' on free threaded builds of Python,
+        'interpreters' where concurrent.futures.InterpreterPoolExecutor is available, and 'processes' otherwise.
+        """
+        if cls._parallel_mode is None:
+            cls._parallel_mode = _detect_parallel_mode()
+        return cls._parallel_mode
+
+    @property
+    def parallel_executor(cls):
+        mode = cls.parallel_mode
+        if mode == 'processes':
+            return cls.process_executor
+        if getattr(cls, '_parallel_executor', None) is None:
+            if mode == 'threads':
+                cls._parallel_executor = concurrent.futures.ThreadPoolExecutor(
+                    cls._processes or os.cpu_count(), thread_name_prefix='unsync-parallel')
+            else:
+                cls._parallel_executor = concurrent.futures.InterpreterPoolExecutor(cls._processes)
+        return cls._parallel_executor
+
+    def warm_up(cls, processes=None, preload=None):
+        """
+        Starts every worker of unsync.process_executor ahead of time, importing the `preload` modules in each,
+        so that the first cpu_bound calls don't pay for spawning processes and importing modules.
+        Returns the process ids of the workers.
+        """
+        if processes is not None or preload is not None:
+            unsync_meta.configure(cls, processes=processes, preload=preload)
+        executor = cls.process_executor
+        # Workers are spawned as tasks are submitted while none are idle. Each task holds its worker briefly,
+        # and rounds are repeated until every worker has run one, so has finished starting up.
+        pids = set()
+        for _ in range(100):
+            futures = [executor.submit(_warm_up_target, 0.01) for _ in range(executor._max_workers)]
+            pids.update(future.result() for future in futures)
+            if len(pids) >= executor._max_workers:
+                break
+        return sorted(pids)
+
 
 class unsync(object, metaclass=unsync_meta):
-    thread_executor = concurrent.futures.ThreadPoolExecutor()
     process_executor = None
     unsync_functions = {}
+    # Set once the function passed the checks done on its first call
+    _checked = False
 
     @staticmethod
     def _thread_target(loop):
@@ -51,50 +465,1314 @@ class unsync(object, metaclass=unsync_meta):
             self.args = args
             self.kwargs = kwargs
             self.func = None
+            if kwargs.get('parallel') not in (None, 'interpreters'):
+                raise ValueError('Unknown parallel mode %r' % kwargs['parallel'])
+            if kwargs.get('placement') == 'hash' and kwargs.get('key') is None:
+                raise TypeError("placement='hash' requires the key argument to hash")
 
     @property
     def cpu_bound(self):
         return 'cpu_bound' in self.kwargs and self.kwargs['cpu_bound']
 
+    @property
+    def batch_size(self):
+        return self.kwargs.get('batch_size')
+
+    @property
+    def placement(self):
+        return self.kwargs.get('placement')
+
+    @property
+    def max_concurrency(self):
+        return self.kwargs.get('max_concurrency')
+
+    @property
+    def shared_memory_threshold(self):
+        shared_memory = self.kwargs.get('shared_memory')
+        if shared_memory is True:
+            return DEFAULT_THRESHOLD
+        return shared_memory or None
+
+    @property
+    def parallel(self):
+        return self.kwargs.get('parallel')
+
+    @property
+    def priority(self):
+        return self.kwargs.get('priority')
+
+    @property
+    def timeout(self):
+        return self.kwargs.get('timeout')
+
+    @property
+    def kill_after(self):
+        return self.kwargs.get('kill_after')
+
+    @property
+    def batch_window(self):
+        return self.kwargs.get('batch_window_ms', 1) / 1000
+
     def _set_func(self, func):
         assert _isfunction(func)
         self.func = func
         functools.update_wrapper(self, func)
+        unsupported = [name for name in _CALL_OPTIONS if self.kwargs.get(name) not in (None, False)]
+        if unsupported and (inspect.isgeneratorfunction(func) or inspect.isasyncgenfunction(func)):
+            # Those apply to calls returning a single result, while generator functions return an Unstream
+            raise TypeError('The unsync generator function %s may not use %s' % (func.__name__, ', '.join(unsupported)))
+        if not (self.cpu_bound or self.parallel):
+            # Only functions that may run in another process are looked up by name
+            return
         # On Windows/Mac MP turns the main module into __mp_main__ in multiprocess targets
         module = "__main__" if func.__module__ == "__mp_main__" else func.__module__
-        unsync.unsync_functions[(module, func.__name__)] = func
+        name = func.__name__
+        if self.cpu_bound and self.shared_memory_threshold:
+            func = share_result(func, self.shared_memory_threshold)
+        unsync.unsync_functions[(module, name)] = func
 
     def __call__(self, *args, **kwargs):
         if self.func is None:
             self._set_func(args[0])
+            if self.priority is not None:
+                self._register_priority()
             return self
-        if inspect.iscoroutinefunction(self.func):
-            if self.cpu_bound:
-                raise TypeError('The CPU bound unsync function %s may not be async or a coroutine' % self.func.__name__)
+        return self._invoke(None, *args, **kwargs)
+
+    def options(self, **call_options):
+        """
+        Returns a callable calling this function with its `priority` or `timeout` replaced for those calls:
+        fetch.options(priority=-1)(url)
+        """
+        unknown = set(call_options) - {'priority', 'timeout'}
+        if unknown:
+            raise TypeError('Unknown call options %s' % ', '.join(sorted(unknown)))
+        if inspect.isgeneratorfunction(self.func) or inspect.isasyncgenfunction(self.func):
+            raise TypeError('The unsync generator function %s may not use call options' % self.func.__name__)
+        if call_options.get('priority') is not None:
+            self._register_priority()
+        return functools.partial(self._invoke, call_options)
+
+    def _invoke(self, call_options, *args, **kwargs):
+        if not self._checked:
+            self._check()
+        cache = self._cache
+        if cache is not None:
+            try:
+                key = (self.func, args, tuple(sorted(kwargs.items())))
+                hash(key)
+            except TypeError:
+                # Calls with unhashable arguments are not cached
+                return self._call(args, kwargs, call_options)
+            return cache.get_or_call(key, lambda: self._call(args, kwargs, call_options))
+        return self._call(args, kwargs, call_options)
+
+    def _call(self, args, kwargs, call_options=None):
+        if self._resilient:
+            loop = self._place(args, kwargs)
+            from unsync.retry import resilient_call
+            retry, hedge = self._resilience
+            return Unfuture(resilient_call(lambda: self._call_once(args, kwargs, call_options, loop), retry, hedge),
+                            loop=loop)
+        return self._call_once(args, kwargs, call_options)
+
+    def _call_once(self, args, kwargs, call_options=None, loop=None):
+        loop = loop or self._place(args, kwargs)
+        call = unsync._submitted(self._stats_name) if unsync._instrumented else None
+        if self._is_stream:
+            return self._stream(args, kwargs, loop, call)
+        priority, timeout = self._priority, self._timeout
+        if call_options:
+            priority, timeout = call_options.get('priority', priority), call_options.get('timeout', timeout)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        if self._held_back:
+            start = functools.partial(self._start, args, kwargs, loop, call, deadline, priority)
+            if self._max_concurrency:
+                start = functools.partial(self._limiter.submit, start, priority)
+            rate_limit = self._rate_limit
+            if rate_limit is not None:
+                future = _throttle(rate_limit, start, loop)
+            else:
+                future = start()
+        else:
+            future = self._start(args, kwargs, loop, call, deadline, priority)
+        if deadline is not None and isinstance(future, concurrent.futures.Future):
+            future = _with_deadline(future, deadline, loop)
+        future = Unfuture(future, loop=loop)
+        if call is not None:
+            future._add_done_callback(functools.partial(unsync._completed, call))
+        return future
+
+    def _start(self, args, kwargs, loop, call=None, deadline=None, priority=None):
+        if self._is_coroutine:
             future = self.func(*args, **kwargs)
+            if call is not None:
+                future = _timed_coroutine(call, future)
+            if deadline is not None:
+                future = _coroutine_deadline(future, deadline)
+            if self._held_back:
+                future = asyncio.run_coroutine_threadsafe(future, loop)
+            return future
+        if self._offloaded and not (self.parallel and unsync.parallel_mode == 'threads'):
+            return self._start_offloaded(args, kwargs, call, priority)
+        if call is not None:
+            return _submit(self._executor(), priority, _timed_call, (call, self.func) + args, kwargs)
+        return _submit(self._executor(), priority, self.func, args, kwargs)
+
+    def _start_offloaded(self, args, kwargs, call, priority):
+        # Functions are looked up by name in each worker process or interpreter
+        func_name = (self.func.__module__, self.func.__name__)
+        if self.parallel and unsync.parallel_mode == 'interpreters':
+            return _ProcessCall(self._executor, func_name, args, kwargs, call, priority=priority).future
+        shared = None
+        # Executors running calls on other machines set supports_shared_memory to False
+        if self.shared_memory_threshold and getattr(self._executor(), 'supports_shared_memory', True):
+            args, kwargs, shared = _shared_arguments.share(args, kwargs, self.shared_memory_threshold)
+        if self.batch_size:
+            future = self._batcher.submit(args, kwargs, call, priority)
+            if shared:
+                future.add_done_callback(lambda _: _shared_arguments.release(shared))
+            return future
+        return _ProcessCall(self._executor, func_name, args, kwargs, call, shared, self.kill_after, priority).future
+
+    def _check(self):
+        # Done on the first call rather than when decorating, which doesn't import inspect, and before the call is
+        # counted by the statistics. Also caches the kind of function and its options for the following calls.
+        func = self.func
+        offloaded = bool(self.cpu_bound or self.parallel)
+        if inspect.iscoroutinefunction(func):
+            if offloaded:
+                raise TypeError('The CPU bound unsync function %s may not be async or a coroutine' % func.__name__)
+            if self.kwargs.get('executor') is not None:
+                raise TypeError('The unsync function %s may not be async and use an executor' % func.__name__)
+        if inspect.isasyncgenfunction(func) and offloaded:
+            raise TypeError('The CPU bound unsync function %s may not be async' % func.__name__)
+        self._is_coroutine = inspect.iscoroutinefunction(func)
+        self._is_stream = inspect.isgeneratorfunction(func) or inspect.isasyncgenfunction(func)
+        self._offloaded = offloaded
+        self._cache = self.kwargs.get('cache')
+        self._resilient = bool(self.kwargs.get('retry')) or self.kwargs.get('hedge_after_ms') is not None
+        self._priority, self._timeout, self._max_concurrency = self.priority, self.timeout, self.max_concurrency
+        self._caller_loop_option = self.kwargs.get('caller_loop')
+        # Calls started later by max_concurrency or rate_limit
+        self._held_back = bool(self._max_concurrency) or self._rate_limit is not None
+        self._checked = True
+
+    def _stream(self, args, kwargs, loop, call=None):
+        stream = Unstream(self.kwargs.get('buffer_size', 64))
+        channel = stream._channel
+        if call is not None:
+            # Recorded once the stream ends, with the exception raised to its consumers
+            channel.completion = concurrent.futures.Future()
+            Unfuture(channel.completion, loop=loop)._add_done_callback(functools.partial(unsync._completed, call))
+        if inspect.isasyncgenfunction(self.func):
+            producer = _stream_async(channel, self.func(*args, **kwargs))
+            if call is not None:
+                producer = _timed_coroutine(call, producer)
+            channel.producer = Unfuture(producer, loop=loop)
+        elif self.cpu_bound or (self.parallel and unsync.parallel_mode != 'threads'):
+            # Streams need a Manager queue, so parallel generators use processes rather than interpreters
+            executor = self._executor if self.cpu_bound else (lambda: unsync.process_executor)
+            channel.producer = _ProcessStream(
+                channel, executor, (self.func.__module__, self.func.__name__), args, kwargs,
+                self.kwargs.get('chunk_size', 64)).job
         else:
-            if self.cpu_bound:
-                future = unsync.process_executor.submit(
-                    _multiprocess_target, (self.func.__module__, self.func.__name__), *args, **kwargs)
+            gen = self.func(*args, **kwargs)
+            if call is not None:
+                channel.producer = self._executor().submit(_timed_call, call, _stream_thread, channel, gen)
             else:
-                future = unsync.thread_executor.submit(self.func, *args, **kwargs)
-        return Unfuture(future)
+                channel.producer = self._executor().submit(_stream_thread, channel, gen)
+        return stream
+
+    def _register_priority(self):
+        # So that calls other functions submit to the same executor are queued by priority along with these
+        if inspect.iscoroutinefunction(self.func):
+            return
+        executor = self.kwargs.get('executor')
+        if executor is None:
+            attribute = '_parallel_executor' if self.parallel else '_process_executor' if self.cpu_bound \
+                else '_thread_executor'
+            executor = ('default', attribute)
+        unsync._prioritize(executor)
+
+    @property
+    def _stats_name(self):
+        return '%s.%s' % (self.func.__module__, getattr(self.func, '__qualname__', self.func.__name__))
+
+    def _executor(self):
+        executor = self.kwargs.get('executor')
+        if executor is None:
+            if self.parallel:
+                return unsync.parallel_executor
+            return unsync.process_executor if self.cpu_bound else unsync.thread_executor
+        if isinstance(executor, str):
+            return unsync.executor(executor)
+        return executor
+
+    def _place(self, args, kwargs):
+        coroutine = self._is_coroutine
+        caller_loop = self._caller_loop_option
+        if caller_loop or (caller_loop is None and unsync._caller_loop):
+            running = asyncio._get_running_loop()
+            if running is not None and coroutine:
+                return running
+        placement = self.placement or unsync._placement
+        key = None
+        if placement == 'hash':
+            # Only coroutines run on their loop, and functions without a key or missing its argument aren't hashed
+            key = self._placement_key(args, kwargs) if coroutine else _NO_KEY
+            if key is _NO_KEY:
+                placement = 'round_robin'
+        return unsync.place(placement, key)
+
+    def _placement_key(self, args, kwargs):
+        key = self.kwargs.get('key')
+        if key is None:
+            return _NO_KEY
+        if callable(key):
+            return key(*args, **kwargs)
+        if isinstance(key, int):
+            return args[key] if -len(args) <= key < len(args) else _NO_KEY
+        if key in kwargs:
+            return kwargs[key]
+        if getattr(self, '_key_index', None) is None:
+            parameters = list(inspect.signature(self.func).parameters)
+            if key not in parameters:
+                raise TypeError('The unsync function %s has no parameter %r to hash' % (self.func.__name__, key))
+            self._key_index = parameters.index(key)
+        return args[self._key_index] if self._key_index < len(args) else _NO_KEY
+
+    @property
+    def _batcher(self):
+        if getattr(self, '_batcher_instance', None) is None:
+            self._batcher_instance = _Batcher(
+                (self.func.__module__, self.func.__name__), self.batch_size, self.batch_window, self._executor)
+        return self._batcher_instance
+
+    @property
+    def _resilience(self):
+        if getattr(self, '_resilience_instance', None) is None:
+            from unsync.retry import Hedge, Retry
+            retry, hedge = self.kwargs.get('retry'), self.kwargs.get('hedge_after_ms')
+            if retry is True:
+                retry = Retry()
+            elif isinstance(retry, int):
+                retry = Retry(retry)
+            self._resilience_instance = (retry or None, None if hedge is None else Hedge(hedge))
+        return self._resilience_instance
+
+    @property
+    def _rate_limit(self):
+        rate_limit = self.kwargs.get('rate_limit')
+        if rate_limit is None or isinstance(rate_limit, RateLimit):
+            return rate_limit
+        # Created once per function from a rate like '100/s'
+        self.kwargs['rate_limit'] = rate_limit = RateLimit(rate_limit, self.kwargs.get('burst'))
+        return rate_limit
+
+    @property
+    def _limiter(self):
+        if getattr(self, '_limiter_instance', None) is None:
+            self._limiter_instance = _Limiter(self.max_concurrency)
+        return self._limiter_instance
 
     def __get__(self, instance, owner):
-        def _call(*args, **kwargs):
-            return self(instance, *args, **kwargs)
+        if instance is None:
+            return self
+        return _BoundUnsync(self, instance)
+
+
+class _BoundUnsync(object):
+    """
+    An @unsync method bound to an instance. Attributes of the wrapped function are read through to it,
+    instead of copying them for each access.
+    """
+    __slots__ = ('unsync', 'instance')
+
+    def __init__(self, unsync, instance):
+        self.unsync = unsync
+        self.instance = instance
+
+    def __call__(self, *args, **kwargs):
+        return self.unsync(self.instance, *args, **kwargs)
 
-        functools.update_wrapper(_call, self.func)
-        return _call
+    def options(self, **call_options):
+        return functools.partial(self.unsync.options(**call_options), self.instance)
+
+    def __getattr__(self, name):
+        return getattr(self.unsync, name)
+
+    @property
+    def __doc__(self):
+        return self.unsync.__doc__
+
+    def __eq__(self, other):
+        return isinstance(other, _BoundUnsync) and self.unsync is other.unsync and self.instance is other.instance
+
+    def __hash__(self):
+        return hash((id(self.unsync), id(self.instance)))
+
+    def __repr__(self):
+        return '<bound unsync method %s of %r>' % (getattr(self.unsync, '__qualname__', '?'), self.instance)
+
+
+_PLACEMENTS = ('round_robin', 'hash', 'sticky')
+# Returned by _placement_key for calls that can't be hashed, which are placed round robin
+_NO_KEY = object()
+# Options of the unsync decorator applying to calls returning a single result
+_CALL_OPTIONS = ('cache', 'retry', 'hedge_after_ms', 'timeout', 'priority', 'max_concurrency', 'rate_limit',
+                 'batch_size')
+_shared_arguments = SharedArguments()
 
 
 def _isfunction(obj):
     return callable(obj)
 
 
+def _process_initializer(preload, initializer, initargs, table=None):
+    _jobs.table = table
+    for module in preload:
+        __import__(module)
+    if initializer is not None:
+        initializer(*initargs)
+
+
+def _after_fork_in_child():
+    # Threads don't survive a fork, so a child process, usually a process pool worker that never makes an @unsync
+    # call, starts whatever loops and executors it uses afresh rather than inheriting ones that can't run
+    for name in ('_loop', '_thread', '_loops', '_thread_executor', '_process_executor', '_parallel_executor',
+                 '_manager_instance'):
+        setattr(unsync, name, None)
+    unsync._loop_threads = []
+    unsync._lag_probes = []
+    unsync._dispatchers = weakref.WeakKeyDictionary()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
+
+
+def _idle_target():
+    pass
+
+
+def _warm_up_target(duration):
+    time.sleep(duration)
+    return os.getpid()
+
+
+def _multiprocess_function(func_name):
+    # Only import on the first call in each worker, or not at all if it was preloaded
+    func = unsync.unsync_functions.get(func_name)
+    if func is None:
+        __import__(func_name[0])
+        func = unsync.unsync_functions[func_name]
+    return func
+
+
+def _tune_loop(loop, slow_callback_duration=None, debug=None, executor=None):
+    if slow_callback_duration is not None:
+        loop.slow_callback_duration = slow_callback_duration
+    if debug is not None:
+        loop.set_debug(debug)
+    if executor is not None:
+        loop.set_default_executor(executor)
+
+
+def _detect_parallel_mode():
+    is_gil_enabled = getattr(sys, '_is_gil_enabled', None)
+    if is_gil_enabled is not None and not is_gil_enabled():
+        return 'threads'
+    if hasattr(concurrent.futures, 'InterpreterPoolExecutor'):
+        return 'interpreters'
+    return 'processes'
+
+
 def _multiprocess_target(func_name, *args, **kwargs):
-    __import__(func_name[0])
-    return unsync.unsync_functions[func_name](*args, **kwargs)
+    return _multiprocess_function(func_name)(*args, **kwargs)
+
+
+class _PreviousResult(object):
+    """Stands for the result of the previous step in the arguments of _multiprocess_chain_target"""
+
+
+def _multiprocess_chain_target(steps):
+    # Runs fused graph nodes one after the other, so only the last result is sent back
+    result = None
+    for func_name, args, kwargs in steps:
+        args = [result if isinstance(value, _PreviousResult) else value for value in args]
+        kwargs = {name: result if isinstance(value, _PreviousResult) else value for name, value in kwargs.items()}
+        result = _multiprocess_function(func_name)(*args, **kwargs)
+    return result
+
+
+def _multiprocess_job_target(job_id, timed, func_name, args, kwargs):
+    func = _multiprocess_function(func_name)
+    _jobs.begin(job_id)
+    try:
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        return (result, time.perf_counter() - start) if timed else result
+    finally:
+        _jobs.end(job_id)
+
+
+class _JobTable(object):
+    """
+    Shared memory arrays through which the parent asks workers of unsync.process_executor to stop a job,
+    and finds the process running a job. Job ids are spread over the slots by their remainder.
+    """
+    SLOTS = 4096
+
+    def __init__(self):
+        import multiprocessing.sharedctypes
+        self.cancelled = multiprocessing.sharedctypes.RawArray('q', self.SLOTS)
+        self.running = multiprocessing.sharedctypes.RawArray('q', self.SLOTS)
+        self.pids = multiprocessing.sharedctypes.RawArray('q', self.SLOTS)
+
+
+class _Jobs(object):
+    def __init__(self):
+        self.ids = itertools.count(1)
+        self.table = None
+        self.current = 0
+
+    def begin(self, job_id):
+        self.current = job_id
+        if self.table is not None:
+            slot = job_id % _JobTable.SLOTS
+            self.table.pids[slot] = os.getpid()
+            self.table.running[slot] = job_id
+
+    def end(self, job_id):
+        self.current = 0
+        if self.table is not None:
+            slot = job_id % _JobTable.SLOTS
+            if self.table.running[slot] == job_id:
+                self.table.running[slot] = 0
+
+    def cancel_requested(self):
+        return bool(self.current and self.table is not None and
+                    self.table.cancelled[self.current % _JobTable.SLOTS] == self.current)
+
+    def cancel(self, job_id):
+        if self.table is not None:
+            self.table.cancelled[job_id % _JobTable.SLOTS] = job_id
+        return True
+
+    def running_pid(self, job_id):
+        if self.table is not None and self.table.running[job_id % _JobTable.SLOTS] == job_id:
+            return self.table.pids[job_id % _JobTable.SLOTS]
+
+
+_jobs = _Jobs()
+_killed_executors = weakref.WeakSet()
+
+
+class _ProcessCall(object):
+    """
+    A cpu_bound call submitted to a process executor. Cancelling its future drops it if it hasn't started,
+    otherwise asks the worker to stop through unsync.cancelled() and, after `kill_after` seconds, kills the worker.
+    Calls that were running on the pool broken by killing a worker are submitted again to its replacement.
+    """
+    def __init__(self, executor, func_name, args, kwargs, call=None, shared=None, kill_after=None, priority=None):
+        self.executor = executor
+        self.func_name = func_name
+        self.args = args
+        self.kwargs = kwargs
+        self.call = call
+        self.shared = shared
+        self.kill_after = kill_after
+        self.priority = priority
+        self.cancelling = False
+        self.job_id = next(_jobs.ids)
+        # Left pending, so it can be cancelled while the job runs
+        self.future = concurrent.futures.Future()
+        self.future.unsync_cancel = self.cancel
+        self._submit()
+
+    def _submit(self):
+        self.pool = self.executor()
+        try:
+            self.source = _submit(self.pool, self.priority, _multiprocess_job_target,
+                                  (self.job_id, self.call is not None, self.func_name, self.args, self.kwargs), {})
+        except Exception as exc:
+            self._finish()
+            self.future.set_exception(exc)
+            return
+        self.source.add_done_callback(self._done)
+
+    def _done(self, source):
+        exc = None if source.cancelled() else source.exception()
+        if isinstance(exc, concurrent.futures.BrokenExecutor) and self.pool in _killed_executors \
+                and not self.future.done():
+            return self._submit()
+        self._finish()
+        if self.future.done():
+            return
+        try:
+            if source.cancelled():
+                self.future.cancel()
+            elif exc is not None:
+                self.future.set_exception(exc)
+            elif self.call is not None:
+                result, self.call.run_time = source.result()
+                self.future.set_result(result)
+            else:
+                self.future.set_result(source.result())
+        except concurrent.futures.InvalidStateError:
+            pass
+
+    def _finish(self):
+        # The cancel hook, the arguments and the source with its result are no longer needed, and would keep
+        # the arguments alive in a reference cycle through the future until the garbage collector runs
+        self.future.__dict__.pop('unsync_cancel', None)
+        self.args = self.kwargs = self.source = None
+        if self.shared:
+            _shared_arguments.release(self.shared)
+            self.shared = None
+
+    def cancel(self):
+        if self.cancelling:
+            return True
+        self.cancelling = True
+        source = self.source
+        if source is None:
+            # Finished meanwhile
+            return False
+        if _cancel_concurrent(source):
+            return True
+        if source.done():
+            return False
+        _jobs.cancel(self.job_id)
+        if self.kill_after is not None and self.pool is getattr(unsync, '_process_executor', None):
+            unsync.loop.call_soon_threadsafe(unsync.loop.call_later, self.kill_after, self._kill)
+        return True
+
+    def _kill(self):
+        pid = _jobs.running_pid(self.job_id)
+        if pid is None or self.source is None or self.source.done():
+            return
+        _killed_executors.add(self.pool)
+        unsync._replace_process_executor(self.pool)
+        try:
+            os.kill(pid, getattr(signal, 'SIGKILL', signal.SIGTERM))
+        except OSError:
+            pass
+
+
+def _cancel_concurrent(future):
+    """Cancels a concurrent Future, and the work behind it if it was made by unsync"""
+    cancelled = future.cancel()
+    cancel = getattr(future, 'unsync_cancel', None)
+    if cancel is not None:
+        cancelled = cancel() or cancelled
+    return cancelled
+
+
+def _with_deadline(source, deadline, loop):
+    future = concurrent.futures.Future()
+    future.unsync_cancel = lambda: _cancel_concurrent(source)
+
+    def expire():
+        if not future.done():
+            _set_concurrent_state(future, exception=asyncio.TimeoutError())
+            _cancel_concurrent(source)
+
+    source.add_done_callback(lambda source: _copy_concurrent_state(source, future))
+    loop.call_soon_threadsafe(loop.call_later, max(0, deadline - time.monotonic()), expire)
+    return future
+
+
+async def _coroutine_deadline(coro, deadline):
+    return await asyncio.wait_for(coro, max(0, deadline - time.monotonic()))
+
+
+def _timed_call(call, func, *args, **kwargs):
+    call.started = time.perf_counter()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        call.finished = time.perf_counter()
+
+
+async def _timed_coroutine(call, coro):
+    call.started = time.perf_counter()
+    try:
+        return await coro
+    finally:
+        call.finished = time.perf_counter()
+
+
+def _multiprocess_batch_target(func_name, calls):
+    # Each outcome is pickled on its own so an unpicklable result only fails its own call.
+    # A BaseException (e.g. SystemExit) raised by one call still fails the whole batch.
+    func = _multiprocess_function(func_name)
+    results = []
+    for job_id, args, kwargs in calls:
+        _jobs.begin(job_id)
+        start = time.perf_counter()
+        try:
+            ok, value = True, func(*args, **kwargs)
+        except Exception as exc:
+            ok, value = False, exc
+        finally:
+            _jobs.end(job_id)
+        run_time = time.perf_counter() - start
+        try:
+            results.append((ok, pickle.dumps(value), run_time))
+        except Exception as exc:
+            error = pickle.PicklingError('Could not pickle the %s of %s: %r' % (
+                'result' if ok else 'exception', func_name[1], exc))
+            results.append((False, pickle.dumps(error), run_time))
+    return results
+
+
+class _Batcher(object):
+    """
+    Gathers calls to a cpu_bound function made within a short window and ships them to
+    unsync.process_executor as a single task, splitting the results back out per call.
+    """
+    def __init__(self, func_name, size, window, executor):
+        self.func_name = func_name
+        self.executor = executor
+        self.size = size
+        self.window = window
+        self.lock = threading.Lock()
+        self.calls = []
+        self.generation = 0
+
+    def submit(self, args, kwargs, call=None, priority=None):
+        future = concurrent.futures.Future()
+        future.unsync_call = call
+        future.unsync_priority = priority
+        future.unsync_job = job_id = next(_jobs.ids)
+        # Once shipped, a call can only be asked to stop through unsync.cancelled()
+        future.unsync_cancel = lambda: _jobs.cancel(job_id)
+        calls = None
+        with self.lock:
+            self.calls.append((future, args, kwargs))
+            if len(self.calls) >= self.size:
+                calls = self._take()
+            elif len(self.calls) == 1:
+                unsync.loop.call_soon_threadsafe(
+                    unsync.loop.call_later, self.window, self._flush_window, self.generation)
+        if calls:
+            self._flush(calls)
+        return future
+
+    def _take(self):
+        calls, self.calls = self.calls, []
+        self.generation += 1
+        return calls
+
+    def _flush_window(self, generation):
+        with self.lock:
+            if generation != self.generation:
+                return
+            calls = self._take()
+        self._flush(calls)
+
+    def _flush(self, calls):
+        # Calls cancelled while waiting for the batch are never shipped
+        calls = [call for call in calls if call[0].set_running_or_notify_cancel()]
+        if not calls:
+            return
+        futures = [call[0] for call in calls]
+        priorities = [future.unsync_priority for future in futures if future.unsync_priority is not None]
+        try:
+            batch = _submit(self.executor(), min(priorities, default=None), _multiprocess_batch_target,
+                            (self.func_name, [(future.unsync_job, args, kwargs) for future, args, kwargs in calls]), {})
+        except Exception as exc:
+            for future in futures:
+                future.set_exception(exc)
+            return
+        batch.add_done_callback(lambda batch: _Batcher._split(batch, futures))
+
+    @staticmethod
+    def _split(batch, futures):
+        exc = concurrent.futures.CancelledError() if batch.cancelled() else batch.exception()
+        if exc is not None:
+            for future in futures:
+                future.set_exception(exc)
+            return
+        for future, (ok, payload, run_time) in zip(futures, batch.result()):
+            if future.unsync_call is not None:
+                future.unsync_call.run_time = run_time
+            try:
+                value = pickle.loads(payload)
+            except Exception as exc:
+                ok, value = False, exc
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
+
+
+def _submit(executor, priority, fn, args, kwargs):
+    dispatcher = unsync._dispatcher(executor, priority)
+    if dispatcher is None:
+        return executor.submit(fn, *args, **kwargs)
+    return dispatcher.submit(lambda: executor.submit(fn, *args, **kwargs), priority)
+
+
+class _Limiter(object):
+    """
+    Caps the number of calls in flight without blocking any thread.
+    Calls over the limit are queued and started by priority from the completion callback of an earlier call.
+    """
+    def __init__(self, limit):
+        self.limit = limit
+        self.lock = threading.Lock()
+        self.running = 0
+        self.pending = _PriorityQueue()
+
+    def submit(self, start, priority=None):
+        future = concurrent.futures.Future()
+        with self.lock:
+            if self.running >= self.limit:
+                self.pending.push(priority or 0, (future, start))
+                return future
+            self.running += 1
+        self._run(future, start)
+        return future
+
+    def _run(self, future, start):
+        while True:
+            if future.set_running_or_notify_cancel():
+                try:
+                    source = start()
+                except Exception as exc:
+                    future.set_exception(exc)
+                else:
+                    future.unsync_cancel = lambda: _cancel_concurrent(source)
+                    source.add_done_callback(lambda source: self._done(source, future))
+                    return
+            # The call was cancelled while queued or failed to start, move on to the next one
+            with self.lock:
+                if not self.pending:
+                    self.running -= 1
+                    return
+                future, start = self.pending.pop()
+
+    def reserve(self, executor):
+        """
+        Counts every worker of `executor` as busy until a task submitted to it now has started, which is once the work
+        already queued in it started, so that calls aren't submitted in order behind that work.
+        """
+        with self.lock:
+            self.running += self.limit
+        for _ in range(self.limit):
+            try:
+                executor.submit(_idle_target).add_done_callback(lambda _: self._release())
+            except Exception:
+                self._release()
+
+    def _done(self, source, future):
+        _copy_concurrent_state(source, future)
+        self._release()
+
+    def _release(self):
+        with self.lock:
+            if not self.pending:
+                self.running -= 1
+                return
+            future, start = self.pending.pop()
+        self._run(future, start)
+
+
+def _throttle(rate_limit, start, loop):
+    """Calls `start` once `rate_limit` allows, waiting on a timer of `loop` rather than in a worker"""
+    delay = rate_limit.reserve()
+    if not delay:
+        return start()
+    future = concurrent.futures.Future()
+
+    def run():
+        if not future.set_running_or_notify_cancel():
+            rate_limit.refund()
+            return
+        try:
+            source = start()
+        except Exception as exc:
+            future.set_exception(exc)
+            return
+        future.unsync_cancel = lambda: _cancel_concurrent(source)
+        source.add_done_callback(lambda source: _copy_concurrent_state(source, future))
+
+    if asyncio._get_running_loop() is loop:
+        loop.call_later(delay, run)
+    else:
+        loop.call_soon_threadsafe(loop.call_later, delay, run)
+    return future
+
+
+class _PriorityQueue(object):
+    """
+    Pops the item with the lowest priority, first in first out between equal priorities, unless the oldest item
+    has waited longer than unsync's starvation limit. Not thread safe.
+    """
+    def __init__(self):
+        self.heap = []
+        self.fifo = collections.deque()
+        self.count = itertools.count()
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def push(self, priority, item):
+        # Entries taken through one of heap and fifo are left in the other, and skipped when reached
+        entry = [priority, next(self.count), time.monotonic(), item, False]
+        heapq.heappush(self.heap, entry)
+        self.fifo.append(entry)
+        self.size += 1
+
+    def pop(self):
+        while self.fifo[0][4]:
+            self.fifo.popleft()
+        if time.monotonic() - self.fifo[0][2] > unsync._starvation_limit:
+            entry = self.fifo.popleft()
+        else:
+            entry = heapq.heappop(self.heap)
+            while entry[4]:
+                entry = heapq.heappop(self.heap)
+        entry[4] = True
+        self.size -= 1
+        item, entry[3] = entry[3], None
+        return item
+
+
+def _copy_concurrent_state(source, target):
+    # The hook cancelling `source` is no longer needed, and would keep both futures in a reference cycle
+    target.__dict__.pop('unsync_cancel', None)
+    if source.cancelled():
+        _set_concurrent_state(target, exception=concurrent.futures.CancelledError())
+    elif source.exception() is not None:
+        _set_concurrent_state(target, exception=source.exception())
+    else:
+        _set_concurrent_state(target, result=source.result())
+
+
+def _set_concurrent_state(future, result=None, exception=None):
+    # The future may have been completed already by a timeout or cancellation
+    if future.done():
+        return
+    try:
+        if exception is not None:
+            future.set_exception(exception)
+        else:
+            future.set_result(result)
+    except concurrent.futures.InvalidStateError:
+        pass
+
+
+def _chain_concurrent(source, future):
+    """Copies the state of concurrent Future `source` to asyncio Future `future`, and cancels `source` with it"""
+    loop = future.get_loop()
+
+    def cancel(future):
+        if future.cancelled():
+            _cancel_concurrent(source)
+
+    future.add_done_callback(cancel)
+    source.add_done_callback(lambda source: _call_soon_threadsafe(loop, _copy_state, source, future))
+
+
+def _copy_to(future, source):
+    # Done callback of `source`, on the loop of `future`
+    _copy_state(source, future)
+
+
+def _copy_state(source, future):
+    # Copies the state of a completed concurrent or asyncio Future to asyncio Future `future`, on its loop
+    if future.done():
+        return
+    if source.cancelled() or isinstance(source.exception(), concurrent.futures.CancelledError):
+        future.cancel()
+    elif source.exception() is not None:
+        future.set_exception(source.exception())
+    else:
+        future.set_result(source.result())
+
+
+def _call_soon_threadsafe(loop, callback, *args):
+    try:
+        loop.call_soon_threadsafe(callback, *args)
+    except RuntimeError:
+        # The loop was closed
+        pass
+
+
+class _AsCompleted(object):
+    def __init__(self, unfutures, window=None, ordered=False, results=False):
+        if window is not None and window < 1:
+            raise ValueError('The window must be at least 1, or None for no limit')
+        self.source = iter(unfutures)
+        self.window = window
+        self.ordered = ordered
+        self.results = results
+        self.lock = threading.Lock()
+        self.condition = threading.Condition(self.lock)
+        # Unfutures in submission order when ordered, otherwise those completed but not yet yielded
+        self.queue = collections.deque()
+        self.pending = 0
+        self.waiter = None
+
+    def _fill(self):
+        while self.source is not None and (self.window is None or self.pending < self.window):
+            try:
+                unfuture = next(self.source)
+            except StopIteration:
+                self.source = None
+                return
+            with self.lock:
+                self.pending += 1
+                if self.ordered:
+                    self.queue.append(unfuture)
+            unfuture._add_done_callback(lambda _, unfuture=unfuture: self._completed(unfuture))
+
+    def _completed(self, unfuture):
+        with self.lock:
+            if not self.ordered:
+                self.queue.append(unfuture)
+            self.condition.notify()
+            waiter, self.waiter = self.waiter, None
+        if waiter is not None:
+            waiter.get_loop().call_soon_threadsafe(_set_result_unless_done, waiter, None)
+
+    def _next_ready(self):
+        # Must hold self.lock
+        if self.queue and (not self.ordered or self.queue[0].done()):
+            self.pending -= 1
+            return self.queue.popleft()
+        if not self.pending:
+            raise StopIteration
+
+    def _yield(self, unfuture):
+        self._fill()
+        return unfuture.result() if self.results else unfuture
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if unsync._in_loop_thread():
+            raise asyncio.InvalidStateError("Blocking iteration in an unsync method is not allowed, use async for")
+        self._fill()
+        with self.lock:
+            unfuture = self._next_ready()
+            while unfuture is None:
+                self.condition.wait()
+                unfuture = self._next_ready()
+        return self._yield(unfuture)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        self._fill()
+        while True:
+            with self.lock:
+                try:
+                    unfuture = self._next_ready()
+                except StopIteration:
+                    raise StopAsyncIteration
+                if unfuture is not None:
+                    break
+                self.waiter = waiter = asyncio.get_event_loop().create_future()
+            await waiter
+        return self._yield(unfuture)
+
+
+class _StreamChannel(object):
+    """
+    The buffer between the producer of an Unstream and its consumers. Producers only hold the channel,
+    so an Unstream that is no longer referenced is collected, and its finalizer cancels the producer.
+    """
+    def __init__(self, maxsize=64):
+        self.maxsize = maxsize
+        self.items = collections.deque()
+        self.lock = threading.Lock()
+        self.not_empty = threading.Condition(self.lock)
+        self.not_full = threading.Condition(self.lock)
+        # asyncio Futures of coroutines waiting for items, or for room in the buffer
+        self.getters = []
+        self.putters = []
+        self.finished = False
+        self.exception = None
+        self.cancelled = False
+        self.producer = None
+        # Completed as the stream ends while stats or hooks are enabled
+        self.completion = None
+
+    def cancel(self):
+        """Stops the producer and ends the stream, dropping buffered items"""
+        with self.lock:
+            if self.finished:
+                return False
+            self.cancelled = True
+            self.items.clear()
+            self._finish(concurrent.futures.CancelledError())
+        producer = self.producer
+        if isinstance(producer, Unfuture):
+            producer.cancel()
+        elif producer is not None:
+            _cancel_concurrent(producer)
+        return True
+
+    def _finish(self, exception=None):
+        # Must hold self.lock
+        if not self.finished:
+            self.finished = True
+            self.exception = exception
+            if self.completion is not None:
+                _set_concurrent_state(self.completion, exception=exception)
+        self._wake(self.not_empty, self.getters, all=True)
+        self._wake(self.not_full, self.putters, all=True)
+
+    def _close(self, exception=None):
+        with self.lock:
+            self._finish(exception)
+
+    def _wake(self, condition, waiters, all=False):
+        # Must hold self.lock
+        if all:
+            condition.notify_all()
+        else:
+            condition.notify()
+        for waiter in waiters:
+            waiter.get_loop().call_soon_threadsafe(_set_result_unless_done, waiter, None)
+        del waiters[:]
+
+    def _put_items(self, items):
+        # Must hold self.lock, returns the items that didn't fit
+        room = self.maxsize - len(self.items)
+        self.items.extend(items[:room])
+        if room > 0:
+            self._wake(self.not_empty, self.getters, all=len(items) > 1)
+        return items[room:]
+
+    def _put_blocking(self, items):
+        """Adds `items` from a producer thread, waiting for room. Returns False once the stream is cancelled"""
+        with self.lock:
+            while not self.cancelled:
+                items = self._put_items(items)
+                if not items:
+                    return True
+                self.not_full.wait()
+        return False
+
+    async def _put(self, item):
+        while True:
+            with self.lock:
+                if self.cancelled:
+                    return False
+                if not self._put_items([item]):
+                    return True
+                waiter = asyncio.get_event_loop().create_future()
+                self.putters.append(waiter)
+            await waiter
+
+    def _take(self):
+        # Must hold self.lock, returns (True, item) or (False, None) when none are buffered
+        if self.items:
+            item = self.items.popleft()
+            self._wake(self.not_full, self.putters)
+            return True, item
+        if self.finished and self.exception is not None:
+            raise self.exception
+        return False, None
+
+    def get(self):
+        if unsync._in_loop_thread():
+            raise asyncio.InvalidStateError("Blocking iteration in an unsync method is not allowed, use async for")
+        with self.lock:
+            while True:
+                ok, item = self._take()
+                if ok:
+                    return item
+                if self.finished:
+                    raise StopIteration
+                self.not_empty.wait()
+
+    async def get_async(self):
+        while True:
+            with self.lock:
+                ok, item = self._take()
+                if ok:
+                    return item
+                if self.finished:
+                    raise StopAsyncIteration
+                waiter = asyncio.get_event_loop().create_future()
+                self.getters.append(waiter)
+            await waiter
+
+
+class Unstream(object):
+    """
+    The items of an @unsync generator, async generator or cpu_bound generator function, as they are produced.
+    Iterate over it with `async for`, or with `for` outside the unsync loop threads. Producers are paused while
+    `buffer_size` items are waiting to be consumed, and cancelled once the Unstream is closed or collected.
+    """
+    def __init__(self, maxsize=64):
+        self._channel = _StreamChannel(maxsize)
+        # Must not hold the Unstream, which the producer doesn't reference either
+        self._finalizer = weakref.finalize(self, self._channel.cancel)
+        self._finalizer.atexit = False
+
+    def cancel(self):
+        """Stops the producer and ends the stream, dropping buffered items"""
+        return self._channel.cancel()
+
+    def close(self):
+        """Stops the producer unless it already finished, for leaving a stream before its end"""
+        self._channel.cancel()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return self._channel.get()
+
+    def __aiter__(self):
+        return self
+
+    def __anext__(self):
+        return self._channel.get_async()
+
+
+async def _stream_async(channel, agen):
+    try:
+        async for item in agen:
+            if not await channel._put(item):
+                break
+    except asyncio.CancelledError:
+        channel._close(concurrent.futures.CancelledError())
+        raise
+    except Exception as exc:
+        # Raised to the consumers rather than through the producer's Unfuture
+        channel._close(exc)
+    finally:
+        await agen.aclose()
+    channel._close()
+
+
+def _stream_thread(channel, gen):
+    try:
+        for item in gen:
+            if not channel._put_blocking([item]):
+                break
+    except BaseException as exc:
+        channel._close(exc)
+    finally:
+        gen.close()
+    channel._close()
+
+
+class _ProcessStream(object):
+    """
+    Runs a cpu_bound generator function in a worker process, which sends its items in chunks of up to `chunk_size`
+    through a bounded multiprocessing.Manager queue. A chunk is sent early once 10 ms passed since the previous one.
+    A thread moves the items from the queue to the channel.
+    """
+    def __init__(self, channel, executor, func_name, args, kwargs, chunk_size):
+        self.channel = channel
+        self.job_id = next(_jobs.ids)
+        self.queue = unsync._manager().Queue(max(1, channel.maxsize // chunk_size))
+        self.job = executor().submit(
+            _multiprocess_stream_target, self.job_id, self.queue, chunk_size, func_name, args, kwargs)
+        self.job.unsync_cancel = lambda: _jobs.cancel(self.job_id)
+        Thread(target=self._pump, name='unsync-stream-%d' % self.job_id, daemon=True).start()
+
+    def _pump(self):
+        while True:
+            try:
+                chunk = self.queue.get(timeout=0.05)
+            except queue.Empty:
+                if not self.job.done():
+                    continue
+                # Every chunk was queued before the job completed
+                try:
+                    chunk = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+            if not self.channel._put_blocking(chunk):
+                _cancel_concurrent(self.job)
+                return
+        if self.job.cancelled():
+            self.channel._close(concurrent.futures.CancelledError())
+        else:
+            self.channel._close(self.job.exception())
+
+
+def _multiprocess_stream_target(job_id, queue, chunk_size, func_name, args, kwargs):
+    func = _multiprocess_function(func_name)
+    _jobs.begin(job_id)
+    chunk, flushed = [], None
+    try:
+        for item in func(*args, **kwargs):
+            chunk.append(item)
+            # The first item is sent right away, then items produced in quick succession are sent together
+            if flushed is None or len(chunk) >= chunk_size or time.monotonic() - flushed > 0.01:
+                if not _put_chunk(queue, chunk):
+                    chunk = []
+                    return
+                chunk, flushed = [], time.monotonic()
+    finally:
+        # Items produced before an exception are still delivered
+        if chunk:
+            _put_chunk(queue, chunk)
+        _jobs.end(job_id)
+
+
+def _put_chunk(chunks, chunk):
+    # Waits for room in the queue until the stream is cancelled
+    while not _jobs.cancel_requested():
+        try:
+            chunks.put(chunk, timeout=0.05)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+
+def _set_result_unless_done(future, result):
+    if not future.done():
+        future.set_result(result)
+
+
+def _start_task(loop, coro, future):
+    asyncio.futures._chain_future(loop.create_task(coro), future)
+
+
+def _continue(continuation, future, source):
+    # Done callback of `source`, on the loop of `future`
+    if future.done():
+        return
+    if source.cancelled():
+        future.cancel()
+        return
+    if source.exception() is not None:
+        future.set_exception(source.exception())
+        return
+    try:
+        result = continuation(source.result())
+    except Exception as exc:
+        future.set_exception(exc)
+        return
+    if isinstance(result, Unfuture):
+        asyncio.futures._chain_future(result.future, future)
+    elif hasattr(result, '__await__'):
+        asyncio.futures._chain_future(asyncio.ensure_future(result), future)
+    else:
+        future.set_result(result)
 
 
 T = TypeVar('T')
@@ -107,51 +1785,160 @@ class Unfuture(Generic[T]):
         future.set_result(value)
         return future
 
-    def __init__(self, future=None):
-        def callback(source, target):
-            try:
-                asyncio.futures._chain_future(source, target)
-            except Exception as exc:
-                if self.concurrent_future.set_running_or_notify_cancel():
-                    self.concurrent_future.set_exception(exc)
-                raise
+    # Only created on demand, see the concurrent_future property
+    _concurrent_future = None
+    # The concurrent Future this Unfuture was created from, cancelled along with it
+    _source = None
+    # The Unfuture this continuation waits on, cancelled along with its last continuation
+    _upstream = None
+    # The number of continuations waiting on this Unfuture that weren't cancelled
+    _consumers = 0
 
+    def __init__(self, future=None, loop=None):
+        loop = loop or unsync.loop
         if asyncio.iscoroutine(future):
-            future = asyncio.ensure_future(future, loop=unsync.loop)
+            if asyncio._get_running_loop() is loop:
+                future = loop.create_task(future)
+            else:
+                # Tasks may only be created from the loop's own thread
+                coro, future = future, asyncio.Future(loop=loop)
+                loop.call_soon_threadsafe(_start_task, loop, coro, future)
         if isinstance(future, concurrent.futures.Future):
-            self.concurrent_future = future
-            self.future = asyncio.Future(loop=unsync.loop)
-            self.future._loop.call_soon_threadsafe(callback, self.concurrent_future, self.future)
+            self._concurrent_future = self._source = future
+            self.future = asyncio.Future(loop=loop)
+            loop.call_soon_threadsafe(self._chain, future, self.future)
         else:
-            self.future = future or asyncio.Future(loop=unsync.loop)
-            self.concurrent_future = concurrent.futures.Future()
-            self.future._loop.call_soon_threadsafe(callback, self.future, self.concurrent_future)
+            self.future = future or asyncio.Future(loop=loop)
+
+    def _chain(self, source, target):
+        chain = _chain_concurrent if isinstance(source, concurrent.futures.Future) else asyncio.futures._chain_future
+        try:
+            chain(source, target)
+        except Exception as exc:
+            if self.concurrent_future.set_running_or_notify_cancel():
+                self.concurrent_future.set_exception(exc)
+            raise
+
+    @property
+    def concurrent_future(self):
+        """
+        The concurrent Future is only needed to block on result() from other threads,
+        so it is created and chained to the asyncio Future on first access.
+        """
+        future = self._concurrent_future
+        if future is None:
+            # setdefault is atomic, so racing threads all end up with the same Future
+            created = concurrent.futures.Future()
+            future = self.__dict__.setdefault('_concurrent_future', created)
+            if future is created:
+                loop = self.future.get_loop()
+                if asyncio._get_running_loop() is loop:
+                    self._chain(self.future, future)
+                else:
+                    # Scheduled after any pending task start since call_soon_threadsafe is FIFO
+                    loop.call_soon_threadsafe(self._chain, self.future, future)
+        return future
+
+    def _add_done_callback(self, callback):
+        # The callback is called with the asyncio Future on its loop
+        loop = self.future.get_loop()
+        if asyncio._get_running_loop() is loop:
+            self.future.add_done_callback(callback)
+        else:
+            loop.call_soon_threadsafe(self.future.add_done_callback, callback)
 
     def __iter__(self):
-        return self.future.__iter__()
+        running = asyncio._get_running_loop()
+        if running is None or running is self.future.get_loop():
+            return self.future.__iter__()
+        # Awaited from a foreign loop, which is woken with a single call_soon_threadsafe once the result is ready
+        future = running.create_future()
+        if self.future.done():
+            _copy_state(self.future, future)
+        elif self._concurrent_future is not None:
+            # Concurrent Futures take callbacks from any thread, so no hop to the unsync loop is needed
+            _chain_concurrent(self._concurrent_future, future)
+        else:
+            self.future.get_loop().call_soon_threadsafe(asyncio.futures._chain_future, self.future, future)
+        return future.__iter__()
 
     __await__ = __iter__
 
     def result(self, *args, **kwargs) -> T:
         # The asyncio Future may have completed before the concurrent one
         if self.future.done():
+            if self.future.cancelled():
+                # Same as blocking on the concurrent Future
+                raise concurrent.futures.CancelledError()
             return self.future.result()
-        # Don't allow waiting in the unsync.thread loop since it will deadlock
-        if threading.current_thread() == unsync.thread and not self.concurrent_future.done():
+        # Don't allow waiting in the unsync loop threads since it will deadlock
+        if unsync._in_loop_thread() and not self._concurrent_done():
             raise asyncio.InvalidStateError("Calling result() in an unsync method is not allowed")
-        # Wait on the concurrent Future outside unsync.thread
+        # Nor in the caller's loop running it with caller_loop, other loops may block on it like any thread
+        if asyncio._get_running_loop() is self.future.get_loop() and not self._concurrent_done():
+            raise asyncio.InvalidStateError("Calling result() in the event loop running it is not allowed")
+        # Wait on the concurrent Future outside the unsync loop threads
         return self.concurrent_future.result(*args, **kwargs)
 
+    def _concurrent_done(self):
+        return self._concurrent_future is not None and self._concurrent_future.done()
+
     def done(self):
-        return self.future.done() or self.concurrent_future.done()
+        return self.future.done() or self._concurrent_done()
+
+    def cancel(self):
+        """
+        Cancels the call behind this Unfuture and returns True, or returns False if it is done or can't be stopped,
+        like a function already running in a thread. Running cpu_bound functions are asked to stop through
+        unsync.cancelled(), and killed after `kill_after` seconds if they set it.
+        A continuation cancels the Unfuture it waits on only if no other continuation waits on it.
+        """
+        if self.done():
+            return False
+        upstream, self._upstream = self._upstream, None
+        if upstream is not None:
+            upstream._consumers -= 1
+            if not upstream._consumers:
+                upstream.cancel()
+        if self._source is not None and not _cancel_concurrent(self._source):
+            return False
+        loop = self.future.get_loop()
+        if asyncio._get_running_loop() is loop:
+            return self.future.cancel() or self._source is not None
+        loop.call_soon_threadsafe(self.future.cancel)
+        return True
+
+    def cancelled(self):
+        return self.future.cancelled() or (self._concurrent_future is not None and self._concurrent_future.cancelled())
 
     def set_result(self, value):
         return self.future._loop.call_soon_threadsafe(lambda: self.future.set_result(value))
 
-    @unsync
-    async def then(self, continuation):
-        await self
-        result = continuation(self.result())
-        if hasattr(result, '__await__'):
-            return await result
-        return result
+    def then(self, continuation):
+        """
+        Calls `continuation` with the result once this Unfuture is done, as a done callback on its loop.
+        Awaitables returned by the continuation are awaited.
+        """
+        return self._then(continuation)
+
+    def then_in_thread(self, continuation, executor=None):
+        """Calls `continuation` with the result in `executor`, which defaults to unsync.thread_executor"""
+        executor = executor or unsync.thread_executor
+        return self._then(lambda result: asyncio.wrap_future(executor.submit(continuation, result)))
+
+    def then_in_process(self, continuation):
+        """Calls the picklable `continuation` with the result in unsync.process_executor"""
+        return self._then(lambda result: asyncio.wrap_future(unsync.process_executor.submit(continuation, result)))
+
+    def _then(self, continuation):
+        unfuture = Unfuture(loop=self.future.get_loop())
+        unfuture._upstream = self
+        self._consumers += 1
+        self._add_done_callback(functools.partial(_continue, continuation, unfuture.future))
+        return unfuture
+
+    def _view(self):
+        """Returns an Unfuture completing along with this one, which can be cancelled without cancelling it"""
+        unfuture = Unfuture(loop=self.future.get_loop())
+        self._add_done_callback(functools.partial(_copy_to, unfuture.future))
+        return unfuture